@@ -8,6 +8,8 @@ from langchain_core.messages import HumanMessage, SystemMessage
 from langgraph.graph import START, StateGraph, MessagesState
 from langgraph.prebuilt import tools_condition, ToolNode
 
+from message_trimming import trim_messages_to_budget
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -69,11 +71,16 @@ logger.info("Tools bound to LLM instance.")
 sys_msg = SystemMessage(content="You are a helpful assistant tasked with performing arithmetic on a set of inputs.")
 logger.info("System message defined: %s", sys_msg.content)
 
+# Token budget for the prompt sent to the LLM on each loop iteration
+max_prompt_tokens = 4000
+
 # Assistant node definition
 def assistant(state: MessagesState):
     logger.info("Assistant node invoked; current messages: %s", state["messages"])
+    messages = trim_messages_to_budget(sys_msg, state["messages"], max_prompt_tokens)
+    logger.info("Sending %d of %d messages to the LLM", len(messages) - 1, len(state["messages"]))
     try:
-        response_msg = llm_with_tools.invoke([sys_msg] + state["messages"])
+        response_msg = llm_with_tools.invoke(messages)
         logger.info("LLM response: %s", response_msg.content)
     except Exception as e:
         logger.error("Error during LLM invocation: %s", e, exc_info=True)
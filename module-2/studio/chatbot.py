@@ -1,13 +1,20 @@
-from langchain_core.messages import HumanMessage, SystemMessage, RemoveMessage
-from langgraph.graph import MessagesState
+from typing import Annotated
+from typing_extensions import TypedDict
+
+from langchain_core.messages import AnyMessage, HumanMessage, SystemMessage, RemoveMessage
 from langgraph.graph import StateGraph, START, END
 
+from indexed_messages import add_messages_indexed
+
 # We will use this model for both the conversation and the summarization
 from langchain_openai import ChatOpenAI
 model = ChatOpenAI(model="gpt-4o", temperature=0) 
 
 # State class to store messages and summary
-class State(MessagesState):
+# The indexed reducer finds replaced and removed messages through an id index instead of rebuilding an id map
+# of the whole thread on every update; each update still copies the list (see indexed_messages.py)
+class State(TypedDict):
+    messages: Annotated[list[AnyMessage], add_messages_indexed]
     summary: str
     
 # Define the logic to call the model
@@ -0,0 +1,153 @@
+import time
+import uuid
+from typing import Union
+
+from langchain_core.messages import (
+    AnyMessage,
+    BaseMessage,
+    BaseMessageChunk,
+    HumanMessage,
+    RemoveMessage,
+    convert_to_messages,
+    message_chunk_to_message,
+)
+from langgraph.graph.message import add_messages
+
+Messages = Union[list[AnyMessage], AnyMessage]
+
+class _Index(dict):
+    """id -> position index, shared by an IndexedMessages and the values derived from it.
+
+    size is the length of the longest list using the index. Positions never move until a removal
+    compacts the list, so a list of that length can be extended with the index as is: the ids it
+    adds sit past the end of every other list sharing it, where they look up as missing.
+    """
+
+    def __init__(self, positions=(), size=0):
+        super().__init__(positions)
+        self.size = size
+
+class IndexedMessages(list):
+    """A list of messages that also keeps an id -> position index.
+
+    Updates never change a list that has been returned: each one applies to a copy (see updated()),
+    so a value read earlier in the run (for example from stream_mode="values") stays as it was.
+    The copy makes every update O(n) in the length of the thread, but it is a memcpy of the message
+    pointers; the index, which would take a pass over the messages in Python to rebuild, is carried
+    over to the copy rather than rebuilt.
+    When the list is restored from a checkpoint it comes back as a plain list and the index is rebuilt once.
+    """
+
+    def __init__(self, messages=(), index=None):
+        super().__init__(messages)
+        self.index = index if index is not None else _Index({m.id: i for i, m in enumerate(self)}, len(self))
+        self.tombstones = 0
+
+    def updated(self, removing: bool = False) -> "IndexedMessages":
+        """A copy of this list for the next update to apply to: O(n), a memcpy of the messages.
+
+        The copy shares the index when this is the longest list using it; otherwise (an older value
+        being updated again), or when the update removes messages, which renumbers the index, the copy
+        gets its own.
+        """
+        if len(self) != self.index.size:
+            index = _Index({m.id: i for i, m in enumerate(self)}, len(self))
+        elif removing:
+            index = _Index(self.index, self.index.size)
+        else:
+            index = self.index
+        return IndexedMessages(self, index)
+
+    def upsert(self, message: BaseMessage) -> None:
+        """Append a message, or replace the message with the same id in place."""
+        position = self.index.get(message.id)
+        if position is None:
+            self.index[message.id] = len(self)
+            self.append(message)
+            self.index.size = len(self)
+        else:
+            self[position] = message
+
+    def remove_id(self, message_id: str) -> None:
+        """Mark the message with this id as removed; the slot is reclaimed by compact()."""
+        position = self.index.pop(message_id, None)
+        if position is None:
+            raise ValueError(f"Attempting to delete a message with an ID that doesn't exist ('{message_id}')")
+        self[position] = None
+        self.tombstones += 1
+
+    def compact(self) -> None:
+        """Drop removed slots and re-number the index in a single pass."""
+        if not self.tombstones:
+            return
+        self[:] = [m for m in self if m is not None]
+        self.index = _Index({m.id: i for i, m in enumerate(self)}, len(self))
+        self.tombstones = 0
+
+def _coerce_messages(messages: Messages) -> list[BaseMessage]:
+    """Convert message-likes to messages and assign missing ids, as add_messages does."""
+    if not isinstance(messages, list):
+        messages = [messages]
+    messages = [
+        message_chunk_to_message(m) if isinstance(m, BaseMessageChunk) else m
+        for m in convert_to_messages(messages)
+    ]
+    for m in messages:
+        if m.id is None:
+            m.id = str(uuid.uuid4())
+    return messages
+
+def add_messages_indexed(left: Messages, right: Messages) -> IndexedMessages:
+    """Merge two lists of messages with the same semantics as add_messages, without rescanning left.
+
+    left is not modified: the update is applied to a copy that reuses left's index, and the copy is
+    returned. Copying left is O(n), but a memcpy, where add_messages makes a pass over left in Python
+    to map its ids on every update. After the copy, each appended or replaced message is an O(1) index
+    lookup. Deletions from RemoveMessage are tombstoned and compacted once at the end of the update,
+    so a bulk delete costs one pass over the list no matter how many messages it removes.
+    """
+    right = _coerce_messages(right)
+    removing = any(isinstance(m, RemoveMessage) for m in right)
+    if isinstance(left, IndexedMessages):
+        merged = left.updated(removing)
+    else:
+        # First update, or a plain list restored from a checkpoint: build the index once
+        merged = IndexedMessages(_coerce_messages(left))
+
+    for m in right:
+        if isinstance(m, RemoveMessage):
+            merged.remove_id(m.id)
+        else:
+            merged.upsert(m)
+
+    merged.compact()
+    return merged
+
+def benchmark(num_messages: int = 10_000) -> None:
+    """Compare add_messages and add_messages_indexed on a thread of num_messages messages."""
+    for name, reducer in [("add_messages", add_messages), ("add_messages_indexed", add_messages_indexed)]:
+        messages = [HumanMessage(content=f"message {i}", id=str(i)) for i in range(num_messages)]
+
+        # Grow the thread one message per update, as a chatbot does
+        state = []
+        start = time.perf_counter()
+        for m in messages:
+            state = reducer(state, [m])
+        append_seconds = time.perf_counter() - start
+
+        # Replace a message in the middle of the thread
+        start = time.perf_counter()
+        state = reducer(state, [HumanMessage(content="edited", id=str(num_messages // 2))])
+        replace_seconds = time.perf_counter() - start
+
+        # Delete all but the 2 most recent messages, as summarize_conversation does
+        start = time.perf_counter()
+        state = reducer(state, [RemoveMessage(id=m.id) for m in state[:-2]])
+        remove_seconds = time.perf_counter() - start
+
+        print(f"{name:22} append x{num_messages}: {append_seconds:.3f}s  "
+              f"replace: {replace_seconds * 1000:.2f}ms  bulk remove: {remove_seconds * 1000:.2f}ms  "
+              f"remaining: {len(state)}")
+
+if __name__ == "__main__":
+    benchmark()
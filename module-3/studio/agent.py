@@ -4,6 +4,8 @@ from langchain_openai import ChatOpenAI
 from langgraph.graph import START, StateGraph, MessagesState
 from langgraph.prebuilt import tools_condition, ToolNode
 
+from message_trimming import trim_messages_to_budget
+
 def add(a: int, b: int) -> int:
     """Adds a and b.
 
@@ -40,9 +42,13 @@ llm_with_tools = llm.bind_tools(tools)
 # System message
 sys_msg = SystemMessage(content="You are a helpful assistant tasked with writing performing arithmetic on a set of inputs.")
 
+# Token budget for the prompt sent to the LLM on each loop iteration
+max_prompt_tokens = 4000
+
 # Node
 def assistant(state: MessagesState):
-   return {"messages": [llm_with_tools.invoke([sys_msg] + state["messages"])]}
+   messages = trim_messages_to_budget(sys_msg, state["messages"], max_prompt_tokens)
+   return {"messages": [llm_with_tools.invoke(messages)]}
 
 # Build graph
 builder = StateGraph(MessagesState)
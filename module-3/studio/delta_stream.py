@@ -0,0 +1,168 @@
+import json
+from collections import deque
+from collections.abc import Mapping, Sequence
+
+from langchain_core.messages import AIMessage, HumanMessage
+
+# Stream graph state to clients as JSON-patch (RFC 6902) deltas instead of full snapshots.
+#
+# stream_mode="values" re-emits the whole state, including every message, after each step.
+# DeltaEncoder sends one snapshot, then only the operations that turn the previously emitted
+# state into the new one. A reconnecting client resumes from the last sequence number it saw:
+# missed deltas are replayed from a short history, or a fresh snapshot is sent if they are gone.
+#
+#   encoder = DeltaEncoder()
+#   for event in stream_deltas(graph, {"messages": [...]}, thread, encoder=encoder):
+#       send(json.dumps(event))
+#   ...
+#   for event in encoder.resume(last_seq):  # on reconnect
+#       send(json.dumps(event))
+
+def to_jsonable(value):
+    """Convert a state value (messages, pydantic models, sequences) into plain JSON data."""
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return value
+    if isinstance(value, Mapping):
+        return {str(k): to_jsonable(v) for k, v in value.items()}
+    if hasattr(value, "model_dump"):
+        return to_jsonable(value.model_dump())
+    if isinstance(value, Sequence):
+        return [to_jsonable(v) for v in value]
+    return str(value)
+
+def _pointer(path: str, key) -> str:
+    return f"{path}/{str(key).replace('~', '~0').replace('/', '~1')}"
+
+def diff(old, new, path: str = "") -> list[dict]:
+    """Return JSON-patch operations that turn old into new.
+
+    Lists are compared by their common prefix and suffix, so appending messages or deleting
+    the oldest ones (as summarization does) costs one operation per message that changed.
+    """
+    if old == new:
+        return []
+
+    if isinstance(old, dict) and isinstance(new, dict):
+        ops = [{"op": "remove", "path": _pointer(path, k)} for k in old if k not in new]
+        for k, v in new.items():
+            if k not in old:
+                ops.append({"op": "add", "path": _pointer(path, k), "value": v})
+            else:
+                ops.extend(diff(old[k], v, _pointer(path, k)))
+        return ops
+
+    if isinstance(old, list) and isinstance(new, list):
+        prefix = 0
+        while prefix < min(len(old), len(new)) and old[prefix] == new[prefix]:
+            prefix += 1
+        suffix = 0
+        while (suffix < min(len(old), len(new)) - prefix
+               and old[len(old) - 1 - suffix] == new[len(new) - 1 - suffix]):
+            suffix += 1
+        removed = old[prefix:len(old) - suffix]
+        added = new[prefix:len(new) - suffix]
+
+        # Same number of items changed in place (e.g. a message edited by id): patch each one
+        if len(removed) == len(added):
+            ops = []
+            for i, (o, n) in enumerate(zip(removed, added)):
+                ops.extend(diff(o, n, _pointer(path, prefix + i)))
+            return ops
+
+        ops = [{"op": "remove", "path": _pointer(path, prefix)} for _ in removed]
+        ops.extend({"op": "add", "path": _pointer(path, prefix + i), "value": v} for i, v in enumerate(added))
+        return ops
+
+    return [{"op": "replace", "path": path, "value": new}]
+
+def apply_patch(doc, ops: list[dict]):
+    """Apply JSON-patch operations produced by diff() to doc in place and return the result."""
+    for op in ops:
+        if op["path"] == "":
+            doc = op["value"]
+            continue
+        *parents, last = [p.replace("~1", "/").replace("~0", "~") for p in op["path"].split("/")[1:]]
+        target = doc
+        for p in parents:
+            target = target[int(p)] if isinstance(target, list) else target[p]
+        if isinstance(target, list):
+            index = len(target) if last == "-" else int(last)
+            if op["op"] == "add":
+                target.insert(index, op["value"])
+            elif op["op"] == "remove":
+                del target[index]
+            else:
+                target[index] = op["value"]
+        elif op["op"] == "remove":
+            del target[last]
+        else:
+            target[last] = op["value"]
+    return doc
+
+class DeltaEncoder:
+    """Turn successive full state values into a snapshot followed by deltas.
+
+    Every event carries a sequence number. The last history_size deltas are kept so a client
+    that reconnects shortly after dropping can catch up without a full snapshot.
+    """
+
+    def __init__(self, history_size: int = 64):
+        self.seq = 0
+        self.state = None
+        self.history = deque(maxlen=history_size)
+
+    def snapshot(self) -> dict:
+        """Full-state event for the current sequence number."""
+        return {"type": "snapshot", "seq": self.seq, "state": self.state}
+
+    def encode(self, values) -> dict:
+        """Encode the next state value as a delta against the previously encoded one."""
+        state = to_jsonable(values)
+        self.seq += 1
+        if self.state is None:
+            self.state = state
+            return self.snapshot()
+        event = {"type": "delta", "seq": self.seq, "ops": diff(self.state, state)}
+        self.state = state
+        self.history.append(event)
+        return event
+
+    def resume(self, last_seq: int = None) -> list[dict]:
+        """Events a reconnecting client needs after last_seq: the missed deltas, or a snapshot."""
+        if last_seq == self.seq:
+            return []
+        if last_seq is not None and self.history and self.history[0]["seq"] <= last_seq + 1 <= self.seq:
+            return [event for event in self.history if event["seq"] > last_seq]
+        return [self.snapshot()]
+
+def stream_deltas(graph, input, config=None, encoder: DeltaEncoder = None, **kwargs):
+    """Stream a graph like stream_mode="values", yielding delta events instead of full states."""
+    encoder = encoder or DeltaEncoder()
+    for values in graph.stream(input, config, stream_mode="values", **kwargs):
+        yield encoder.encode(values)
+
+def compare_bandwidth(num_turns: int = 200) -> None:
+    """Compare bytes sent for values vs delta streaming on a long simulated chatbot thread."""
+    encoder = DeltaEncoder()
+    client_state = None
+    messages = []
+    values_bytes = delta_bytes = 0
+
+    for turn in range(num_turns):
+        for message in (HumanMessage(content=f"Question {turn}: what is {turn} times 3?", id=f"h{turn}"),
+                        AIMessage(content=f"{turn} times 3 is {turn * 3}.", id=f"a{turn}")):
+            messages = messages + [message]
+            values = {"messages": messages}
+            values_bytes += len(json.dumps(to_jsonable(values)))
+
+            event = encoder.encode(values)
+            delta_bytes += len(json.dumps(event))
+            client_state = event["state"] if event["type"] == "snapshot" else apply_patch(client_state, event["ops"])
+
+    assert client_state == to_jsonable({"messages": messages})
+    print(f"{num_turns} turns, {len(messages)} messages")
+    print(f"stream_mode='values': {values_bytes / 1024:,.0f} KB")
+    print(f"delta stream:         {delta_bytes / 1024:,.0f} KB ({values_bytes / delta_bytes:.0f}x less)")
+
+if __name__ == "__main__":
+    compare_bandwidth()
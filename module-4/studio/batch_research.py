@@ -0,0 +1,179 @@
+"""Run the research assistant over a JSONL dataset of topics.
+
+Each input line is a JSON object with a "topic" and optionally:
+- "id": stable identifier of the topic (defaults to a hash of the topic)
+- "max_analysts" / "max_num_turns": graph inputs (default to the command line values)
+- "feedback": list of human_analyst_feedback strings, applied in order each time the graph asks for
+  feedback; once they run out (or with no list) the analysts are approved
+- "configurable": extra configurable values for the run
+
+    python batch_research.py topics.jsonl reports.jsonl --workers 4
+
+Each finished topic is appended to the output JSONL as soon as it is done. Runs are checkpointed
+in SQLite under thread "batch:<id>", so a batch that crashed resumes where it stopped: topics
+already in the output are skipped and unfinished ones continue from their last checkpoint.
+A finished topic's checkpoints are deleted once its report is written, and the chunks of the list
+channels (kept in "<checkpoints>.chunks.sqlite") that no remaining checkpoint uses are deleted when
+the batch ends.
+"""
+import argparse
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Iterator, Optional
+
+from langgraph.checkpoint.sqlite import SqliteSaver
+
+from doc_store import pop_store
+from reducers import ChunkedSerializer, SqliteChunkStore
+from research_assistant import builder, default_max_concurrency
+
+def read_topics(path: str) -> Iterator[dict]:
+    with open(path) as f:
+        for line in f:
+            if line.strip():
+                record = json.loads(line)
+                record.setdefault("id", hashlib.sha256(record["topic"].encode()).hexdigest()[:16])
+                yield record
+
+def completed_ids(path: str) -> set:
+    """Ids of the topics that already have a report in the output file."""
+    if not os.path.exists(path):
+        return set()
+    with open(path) as f:
+        return {record["id"] for record in map(json.loads, filter(str.strip, f)) if "final_report" in record}
+
+def next_feedback(record: dict, answered: int) -> str:
+    """The scripted feedback after answered interrupts, or "approve" once the script is done."""
+    feedback = record.get("feedback", [])
+    return feedback[answered] if answered < len(feedback) else "approve"
+
+def feedback_answered(graph, config: dict) -> int:
+    """Feedback interrupts answered so far in the thread: run_topic's update_state calls, each a checkpoint of its own."""
+    return sum(1 for state in graph.get_state_history(config) if state.metadata.get("source") == "update")
+
+def delete_thread(checkpointer: SqliteSaver, thread_id: str) -> None:
+    """Delete every checkpoint and pending write of a thread (SqliteSaver.delete_thread, which older versions lack)."""
+    with checkpointer.cursor() as cur:
+        cur.execute("DELETE FROM checkpoints WHERE thread_id = ?", (thread_id,))
+        cur.execute("DELETE FROM writes WHERE thread_id = ?", (thread_id,))
+
+def thread_id(record: dict) -> str:
+    return f"batch:{record['id']}"
+
+def run_topic(graph, record: dict, max_analysts: int, max_num_turns: int) -> dict:
+    """Run one topic to its final report, resuming from its checkpoint if it was interrupted."""
+    config = {"configurable": {**record.get("configurable", {}), "thread_id": thread_id(record)}}
+
+    try:
+        state = graph.get_state(config)
+        if not state.values:
+            graph.invoke({"topic": record["topic"],
+                          "max_analysts": record.get("max_analysts", max_analysts),
+                          "max_num_turns": record.get("max_num_turns", max_num_turns)}, config)
+        elif state.next and state.next != ("human_feedback",):
+            # Crashed mid-run: continue from the last checkpoint
+            graph.invoke(None, config)
+
+        # Answer every feedback interrupt until the run completes
+        while (state := graph.get_state(config)).next:
+            if state.next == ("human_feedback",):
+                feedback = next_feedback(record, feedback_answered(graph, config))
+                graph.update_state(config, {"human_analyst_feedback": feedback}, as_node="human_feedback")
+            graph.invoke(None, config)
+    finally:
+        # The run is over for this batch, finished or not: free its documents (a resume carries on with the ones it retrieves again)
+        pop_store(graph.get_state(config).values.get("doc_store_id"))
+
+    values = state.values
+    return {
+        "id": record["id"],
+        "topic": record["topic"],
+        "analysts": [analyst.name for analyst in values.get("analysts", [])],
+        "final_report": values["final_report"],
+        "interview_stats": list(values.get("interview_stats", [])),
+        "failed_interviews": list(values.get("failed_interviews", [])),
+    }
+
+def run_batch(input_path: str,
+              output_path: str,
+              checkpoints_path: str,
+              workers: int = 4,
+              max_analysts: int = 3,
+              max_num_turns: int = 2) -> dict:
+    """Run every topic of input_path not yet in output_path, workers topics at a time."""
+    done = completed_ids(output_path)
+    records = [r for r in read_topics(input_path) if r["id"] not in done]
+
+    conn = sqlite3.connect(checkpoints_path, check_same_thread=False)
+    # Each checkpoint only adds the new chunks of the list channels. The chunks get a database of their own:
+    # a second connection to the checkpoint database would contend with the checkpointer's for its lock
+    serde = ChunkedSerializer(store=SqliteChunkStore(os.path.splitext(checkpoints_path)[0] + ".chunks.sqlite"))
+    checkpointer = SqliteSaver(conn, serde=serde)
+    graph = builder.compile(interrupt_before=["human_feedback"], checkpointer=checkpointer).with_config(
+        max_concurrency=default_max_concurrency)
+
+    write_lock = threading.Lock()
+    completed = failed = 0
+    start = time.perf_counter()
+
+    def write(result: dict) -> None:
+        with write_lock, open(output_path, "a") as f:
+            f.write(json.dumps(result) + "\n")
+            f.flush()
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {executor.submit(run_topic, graph, r, max_analysts, max_num_turns): r for r in records}
+        for future in as_completed(futures):
+            record = futures[future]
+            try:
+                result = future.result()
+                result["seconds"] = time.perf_counter() - start
+                write(result)
+                # The topic is skipped from now on, so its checkpoints are no longer needed
+                delete_thread(checkpointer, thread_id(record))
+                completed += 1
+                status = "done"
+            except Exception as e:
+                # Recorded without a report, so the next run of the batch retries the topic
+                write({"id": record["id"], "topic": record["topic"], "error": repr(e)})
+                failed += 1
+                status = f"failed: {e!r}"
+            elapsed = time.perf_counter() - start
+            print(f"[{completed + failed}/{len(records)}] {record['id']} {status} "
+                  f"({completed / elapsed * 3600:.1f} topics/hour)", flush=True)
+
+    # No run writes to the checkpointer any more: drop the chunks of the deleted threads
+    chunks_deleted = serde.collect(checkpointer)
+    conn.close()
+    elapsed = time.perf_counter() - start
+    stats = {
+        "completed": completed,
+        "failed": failed,
+        "skipped": len(done),
+        "seconds": elapsed,
+        "topics_per_hour": completed / elapsed * 3600 if elapsed else 0.0,
+        "chunks_deleted": chunks_deleted,
+    }
+    print(f"{completed} topics in {elapsed:.0f}s ({stats['topics_per_hour']:.1f} topics/hour), "
+          f"{failed} failed, {len(done)} already done")
+    return stats
+
+def main(argv: Optional[list[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("input", help="JSONL file of topics")
+    parser.add_argument("output", help="JSONL file the reports are appended to")
+    parser.add_argument("--checkpoints", default="batch_checkpoints.sqlite", help="SQLite checkpoint database")
+    parser.add_argument("--workers", type=int, default=4, help="topics running at once")
+    parser.add_argument("--max-analysts", type=int, default=3)
+    parser.add_argument("--max-num-turns", type=int, default=2)
+    args = parser.parse_args(argv)
+    run_batch(args.input, args.output, args.checkpoints,
+              workers=args.workers, max_analysts=args.max_analysts, max_num_turns=args.max_num_turns)
+
+if __name__ == "__main__":
+    main()
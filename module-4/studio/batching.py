@@ -0,0 +1,70 @@
+import contextvars
+import threading
+from concurrent.futures import Future
+from typing import Optional
+
+from langchain_core.runnables import Runnable, RunnableConfig
+from langchain_core.runnables.config import ensure_config
+
+class MicroBatcher:
+    """Collect concurrent invoke() calls to one runnable and send them together through .batch().
+
+    Calls that arrive within window seconds of the first one are grouped, up to max_batch_size.
+    The batch is sent when it fills up (by the caller that filled it) or when the window closes
+    (by a timer), and each caller gets back its own result or exception.
+
+    Each input goes to .batch() with its caller's config (by default the config of the node it is
+    called from), so callbacks and tracing see the call under the run that made it. The timer sends
+    the batch from a copy of the context of the caller that opened the window.
+    """
+
+    def __init__(self, runnable: Runnable, window: float = 0.02, max_batch_size: int = 16):
+        self.runnable = runnable
+        self.window = window
+        self.max_batch_size = max_batch_size
+        self._queue: list[tuple[object, RunnableConfig, Future]] = []
+        self._timer = None
+        self._lock = threading.Lock()
+
+    def invoke(self, input, config: Optional[RunnableConfig] = None):
+        future = Future()
+        # Resolved here, in the caller's context: the batch is sent from another caller or the timer thread
+        config = ensure_config(config)
+        batch = None
+        with self._lock:
+            self._queue.append((input, config, future))
+            if len(self._queue) >= self.max_batch_size:
+                batch = self._take()
+            elif self._timer is None:
+                self._timer = threading.Timer(self.window, contextvars.copy_context().run, (self._flush,))
+                self._timer.daemon = True
+                self._timer.start()
+        if batch:
+            self._send(batch)
+        return future.result()
+
+    def _take(self) -> list:
+        batch, self._queue = self._queue, []
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        return batch
+
+    def _flush(self) -> None:
+        with self._lock:
+            batch = self._take()
+        if batch:
+            self._send(batch)
+
+    def _send(self, batch: list) -> None:
+        try:
+            results = self.runnable.batch([input for input, _, _ in batch],
+                                          [config for _, config, _ in batch],
+                                          return_exceptions=True)
+        except Exception as e:
+            results = [e] * len(batch)
+        for (_, _, future), result in zip(batch, results):
+            if isinstance(result, Exception):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
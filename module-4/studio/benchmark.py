@@ -0,0 +1,267 @@
+"""Offline benchmark of the research assistant graph.
+
+Runs the full graph (analysts, human approval, interviews, report) against a deterministic fake chat
+model and fake web / Wikipedia search, so it needs no API keys or network and can run in CI:
+
+    python benchmark.py --analysts 1,4,16,64 --turns 1,3,5
+    python benchmark.py --smoke  # one small sweep without latency, as a quick check that the graph runs end to end
+
+For each analysts x turns cell it reports the wall time with the configured model latency, the
+graph's own overhead (wall time of the same run with zero latency), the bytes written by the
+checkpointer and the peak traced Python memory.
+"""
+import argparse
+import hashlib
+import json
+import os
+import random
+import re
+import tempfile
+import time
+import tracemalloc
+from typing import Any, Optional
+
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage, get_buffer_string
+from langchain_core.outputs import ChatGeneration, ChatResult
+from langchain_core.runnables import RunnableLambda
+from langgraph.checkpoint.memory import MemorySaver
+from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer
+
+# The graph modules create their clients and caches on import; none of them is used for real here
+os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+os.environ.setdefault("RETRIEVAL_CACHE_PATH", os.path.join(tempfile.gettempdir(), "benchmark_retrieval_cache.sqlite"))
+os.environ.setdefault("BRANCH_RESULTS_PATH", os.path.join(tempfile.gettempdir(), "benchmark_branch_results.sqlite"))
+
+import research_assistant
+import retrieval
+from branch_results import BranchResults
+from retrieval_cache import RetrievalCache
+
+vocabulary = """model agent graph state memory retrieval latency token context planner tool search
+evaluation benchmark dataset cache router stream checkpoint prompt reasoning safety alignment
+throughput cost quality workflow interview analyst expert source report section summary""".split()
+
+def seeded(*parts) -> random.Random:
+    """A random generator seeded from parts, so the same input always gives the same output."""
+    return random.Random(hashlib.blake2b(json.dumps(parts, default=str).encode(), digest_size=8).digest())
+
+def fake_text(rng: random.Random, tokens: int) -> str:
+    return " ".join(rng.choice(vocabulary) for _ in range(max(tokens, 1)))
+
+class FakeChatModel(BaseChatModel):
+    """Deterministic chat model with configurable latency and output length.
+
+    Latency is drawn from a normal distribution around latency (clipped at 0), output length from
+    one around tokens_mean. Both are seeded by the prompt, so repeated runs produce the same calls.
+    """
+
+    latency: float = 0.0
+    latency_jitter: float = 0.0
+    tokens_mean: int = 200
+    tokens_sd: int = 50
+    seed: int = 0
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-benchmark"
+
+    def _call(self, prompt: str) -> tuple[random.Random, int]:
+        rng = seeded(self.seed, prompt)
+        time.sleep(max(rng.gauss(self.latency, self.latency_jitter), 0.0))
+        return rng, max(int(rng.gauss(self.tokens_mean, self.tokens_sd)), 1)
+
+    def _generate(self, messages: list[BaseMessage], stop=None, run_manager=None, **kwargs) -> ChatResult:
+        prompt = get_buffer_string(messages)
+        rng, tokens = self._call(prompt)
+        input_tokens = len(prompt) // 4
+        message = AIMessage(
+            content=fake_text(rng, tokens),
+            usage_metadata={"input_tokens": input_tokens, "output_tokens": tokens, "total_tokens": input_tokens + tokens},
+        )
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def with_structured_output(self, schema, **kwargs):
+        def structured(input):
+            messages = input if isinstance(input, list) else [input]
+            prompt = get_buffer_string(messages)
+            rng, _ = self._call(prompt)
+            if schema is research_assistant.Perspectives:
+                count = int(re.search(r"Pick the top (\d+) themes", prompt).group(1))
+                return schema(analysts=[
+                    research_assistant.Analyst(
+                        affiliation=f"Lab {i % 7}",
+                        name=f"Analyst {i}",
+                        role=fake_text(rng, 3),
+                        description=fake_text(rng, rng.randint(10, 60)),
+                    )
+                    for i in range(count)
+                ])
+            if schema is research_assistant.SearchQuery:
+                return schema(search_query=fake_text(rng, 4))
+            raise ValueError(f"FakeChatModel has no structured output for {schema.__name__}")
+
+        return RunnableLambda(structured)
+
+class FakeSearch:
+    """Fake web and Wikipedia search over a fixed pool of documents.
+
+    Queries map deterministically onto the pool, so different analysts sometimes retrieve the same
+    pages, as they do against the real services.
+    """
+
+    def __init__(self, latency: float = 0.0, doc_tokens: int = 300, pool_size: int = 200, seed: int = 0):
+        self.latency = latency
+        self.doc_tokens = doc_tokens
+        self.pool_size = pool_size
+        self.seed = seed
+        search = self
+
+        class TavilySearchResults:
+            def __init__(self, max_results: int = 3, **kwargs):
+                self.max_results = max_results
+
+            def invoke(self, query: str) -> list[dict]:
+                return [{"url": f"https://example.com/{i}", "content": search.document("web", i)}
+                        for i in search.matches("web", query, self.max_results)]
+
+        class Wikipedia:
+            class exceptions:
+                class PageError(Exception):
+                    pass
+
+                class DisambiguationError(Exception):
+                    pass
+
+            @staticmethod
+            def search(query: str, results: int = 2) -> list[str]:
+                return [f"Page {i}" for i in search.matches("wikipedia", query, results)]
+
+            @staticmethod
+            def page(title: str, auto_suggest: bool = False):
+                time.sleep(search.latency)
+                i = int(title.split()[-1])
+                return type("Page", (), {"content": search.document("wikipedia", i), "summary": title,
+                                         "url": f"https://en.wikipedia.org/wiki/Page_{i}"})
+
+        self.TavilySearchResults = TavilySearchResults
+        self.wikipedia = Wikipedia
+
+    def matches(self, source: str, query: str, count: int) -> list[int]:
+        time.sleep(self.latency)
+        rng = seeded(self.seed, source, query)
+        return rng.sample(range(self.pool_size), count)
+
+    def document(self, source: str, i: int) -> str:
+        return fake_text(seeded(self.seed, source, i), self.doc_tokens)
+
+class CountingSerializer(JsonPlusSerializer):
+    """Checkpoint serializer that counts the bytes it writes."""
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.bytes_written = 0
+
+    def dumps_typed(self, obj: Any) -> tuple[str, bytes]:
+        type_, data = super().dumps_typed(obj)
+        self.bytes_written += len(data)
+        return type_, data
+
+def install(model: FakeChatModel, search: FakeSearch, workdir: str) -> None:
+    """Point the research assistant at the fakes, with fresh caches in workdir."""
+    research_assistant.llm = model
+    research_assistant.branch_results = BranchResults(os.path.join(workdir, "branch_results.sqlite"))
+    retrieval.TavilySearchResults = search.TavilySearchResults
+    retrieval.wikipedia = search.wikipedia
+    retrieval.cache = RetrievalCache(os.path.join(workdir, "retrieval_cache.sqlite"))
+
+def run_once(analysts: int,
+             turns: int,
+             latency: float = 0.0,
+             latency_jitter: float = 0.0,
+             search_latency: float = 0.0,
+             tokens_mean: int = 200,
+             tokens_sd: int = 50,
+             concurrency: int = 4,
+             trace_memory: bool = False,
+             seed: int = 0) -> dict:
+    """Run the research graph once, from topic to final report, and measure it."""
+    with tempfile.TemporaryDirectory() as workdir:
+        install(FakeChatModel(latency=latency, latency_jitter=latency_jitter,
+                              tokens_mean=tokens_mean, tokens_sd=tokens_sd, seed=seed),
+                FakeSearch(latency=search_latency, seed=seed),
+                workdir)
+        serde = CountingSerializer()
+        graph = research_assistant.builder.compile(interrupt_before=["human_feedback"],
+                                                   checkpointer=MemorySaver(serde=serde))
+        config = {"configurable": {"thread_id": "benchmark"}, "recursion_limit": 1000, "max_concurrency": concurrency}
+
+        if trace_memory:
+            tracemalloc.start()
+        start = time.perf_counter()
+        graph.invoke({"topic": "Benchmarking agent frameworks", "max_analysts": analysts, "max_num_turns": turns}, config)
+        graph.update_state(config, {"human_analyst_feedback": "approve"}, as_node="human_feedback")
+        state = graph.invoke(None, config)
+        wall = time.perf_counter() - start
+        peak = None
+        if trace_memory:
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+
+    assert state.get("final_report") and len(state["sections"]) == analysts
+    return {"wall": wall, "checkpoint_bytes": serde.bytes_written, "peak_memory": peak}
+
+def sweep(analysts: list[int], turns: list[int], **kwargs) -> list[dict]:
+    results = []
+    for n in analysts:
+        for t in turns:
+            timed = run_once(n, t, **kwargs)
+            # The same run without model or search latency: what is left is the graph's own overhead
+            overhead_kwargs = {**kwargs, "latency": 0.0, "latency_jitter": 0.0, "search_latency": 0.0}
+            overhead = run_once(n, t, **overhead_kwargs)
+            memory = run_once(n, t, trace_memory=True, **overhead_kwargs)
+            result = {
+                "analysts": n,
+                "turns": t,
+                "wall": timed["wall"],
+                "overhead": overhead["wall"],
+                "checkpoint_bytes": timed["checkpoint_bytes"],
+                "peak_memory": memory["peak_memory"],
+            }
+            results.append(result)
+            print(f"{n:>3} analysts x {t} turns: wall {result['wall']:7.2f}s  overhead {result['overhead']:6.2f}s  "
+                  f"checkpoints {result['checkpoint_bytes'] / 1024:9,.0f} KB  "
+                  f"peak memory {result['peak_memory'] / 2**20:7.1f} MB", flush=True)
+    return results
+
+def int_list(value: str) -> list[int]:
+    return [int(v) for v in value.split(",")]
+
+def main(argv: Optional[list[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--analysts", type=int_list, default=[1, 2, 4, 8, 16, 32, 64])
+    parser.add_argument("--turns", type=int_list, default=[1, 2, 3, 4, 5])
+    parser.add_argument("--latency", type=float, default=0.01, help="mean seconds per model call")
+    parser.add_argument("--latency-jitter", type=float, default=0.005)
+    parser.add_argument("--search-latency", type=float, default=0.005, help="seconds per search or page load")
+    parser.add_argument("--tokens-mean", type=int, default=200, help="mean tokens per model response")
+    parser.add_argument("--tokens-sd", type=int, default=50)
+    parser.add_argument("--concurrency", type=int, default=4, help="max interviews running at once")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="also write the results to this file")
+    parser.add_argument("--smoke", action="store_true", help="only run 1,4 analysts x 1,3 turns with no latency")
+    args = parser.parse_args(argv)
+    if args.smoke:
+        args.analysts, args.turns = [1, 4], [1, 3]
+        args.latency = args.latency_jitter = args.search_latency = 0.0
+
+    results = sweep(args.analysts, args.turns,
+                    latency=args.latency, latency_jitter=args.latency_jitter, search_latency=args.search_latency,
+                    tokens_mean=args.tokens_mean, tokens_sd=args.tokens_sd,
+                    concurrency=args.concurrency, seed=args.seed)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+import hashlib
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any
+
+from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer
+
+@dataclass(frozen=True)
+class BlobHandle:
+    """Reference to a value in a BlobStore. The handle, not the value, goes into state and checkpoints."""
+    key: str # SHA-256 of the serialized value
+    size: int # Bytes of the serialized value
+
+class BlobStore:
+    """Local content-addressed store for large state values.
+
+    put serializes a value once, with the checkpoint serializer, and writes it to <root>/<key[:2]>/<key>,
+    key being the SHA-256 of the bytes: storing the same value again reuses the file. Recently used
+    values stay in memory (up to max_cached_bytes of them, by serialized size), so every subgraph that
+    resolves the same handle in this process gets the same object instead of its own copy. Values must
+    not be mutated.
+
+    Each put should be paired with a release once the value is no longer needed. Runs that put the same
+    value share its file, which is deleted when the last of them releases it; the counts are kept per
+    process, so a handle put by another process (or before a restart) is deleted by its first release.
+    """
+
+    def __init__(self, root: str, max_cached_bytes: int = 256 * 2**20):
+        self.root = root
+        self.max_cached_bytes = max_cached_bytes
+        self.serde = JsonPlusSerializer()
+        self._cache: OrderedDict[str, tuple[Any, int]] = OrderedDict()
+        self._cached_bytes = 0
+        self._refs: dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.root, key[:2], key)
+
+    def _remember(self, handle: BlobHandle, value: Any) -> None:
+        with self._lock:
+            self._forget(handle.key)
+            if handle.size > self.max_cached_bytes:
+                return
+            self._cache[handle.key] = (value, handle.size)
+            self._cached_bytes += handle.size
+            while self._cached_bytes > self.max_cached_bytes:
+                _, (_, size) = self._cache.popitem(last=False)
+                self._cached_bytes -= size
+
+    def _forget(self, key: str) -> None:
+        # Called with the lock held
+        cached = self._cache.pop(key, None)
+        if cached is not None:
+            self._cached_bytes -= cached[1]
+
+    def put(self, value: Any) -> BlobHandle:
+        type_, data = self.serde.dumps_typed(value)
+        payload = type_.encode() + b"\n" + data
+        key = hashlib.sha256(payload).hexdigest()
+        path = self._path(key)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # Written under a temporary name and renamed, so a reader never sees a partial blob
+            fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path))
+            with os.fdopen(fd, "wb") as f:
+                f.write(payload)
+            os.replace(tmp, path)
+        handle = BlobHandle(key=key, size=len(payload))
+        with self._lock:
+            self._refs[key] = self._refs.get(key, 0) + 1
+        self._remember(handle, value)
+        return handle
+
+    def get(self, handle: BlobHandle) -> Any:
+        with self._lock:
+            if handle.key in self._cache:
+                self._cache.move_to_end(handle.key)
+                return self._cache[handle.key][0]
+        with open(self._path(handle.key), "rb") as f:
+            type_, _, data = f.read().partition(b"\n")
+        value = self.serde.loads_typed((type_.decode(), data))
+        self._remember(handle, value)
+        return value
+
+    def resolve(self, value: Any) -> Any:
+        """The stored value if value is a handle, else value itself."""
+        return self.get(value) if isinstance(value, BlobHandle) else value
+
+    def release(self, handle: BlobHandle) -> None:
+        """Undo one put of this handle's value, deleting it once no put is left."""
+        with self._lock:
+            refs = self._refs.pop(handle.key, 0) - 1
+            if refs > 0:
+                self._refs[handle.key] = refs
+                return
+        self.delete(handle)
+
+    def delete(self, handle: BlobHandle) -> None:
+        with self._lock:
+            self._forget(handle.key)
+        try:
+            os.remove(self._path(handle.key))
+        except FileNotFoundError:
+            pass
@@ -0,0 +1,49 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from typing import Any, Optional
+
+class BranchResults:
+    """SQLite-backed results of the fan-out branches of a run, keyed by run id and branch key.
+
+    A branch that completed is not run again when the run is resumed or retried, even in another
+    process. Values must be JSON-serializable.
+    """
+
+    def __init__(self, path: str):
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS branch_results "
+                "(run_id TEXT, branch TEXT, value TEXT, completed_at REAL, PRIMARY KEY (run_id, branch))"
+            )
+
+    @staticmethod
+    def branch_key(branch: str) -> str:
+        return hashlib.sha256(branch.encode()).hexdigest()
+
+    def get(self, run_id: Optional[str], branch: str) -> Optional[Any]:
+        if run_id is None:
+            return None
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value FROM branch_results WHERE run_id = ? AND branch = ?", (run_id, self.branch_key(branch))
+            ).fetchone()
+        return None if row is None else json.loads(row[0])
+
+    def put(self, run_id: Optional[str], branch: str, value: Any) -> None:
+        if run_id is None:
+            return
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO branch_results (run_id, branch, value, completed_at) VALUES (?, ?, ?, ?)",
+                (run_id, self.branch_key(branch), json.dumps(value), time.time()),
+            )
+
+    def drop(self, run_id: Optional[str]) -> None:
+        """Forget every branch of a run, once the run is done."""
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM branch_results WHERE run_id = ?", (run_id,))
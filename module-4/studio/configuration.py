@@ -0,0 +1,42 @@
+import os
+from dataclasses import dataclass, fields
+from typing import Any, Optional
+
+from langchain_core.runnables import RunnableConfig
+
+@dataclass(kw_only=True)
+class Configuration:
+    """The configurable fields for the module-4 graphs."""
+    retrieval_deadline: float = 10.0 # Seconds to wait for retrieval sources before answering
+    retrieval_min_sources: int = 2 # Answer as soon as this many sources have returned
+    answer_context_tokens: int = 2000 # Token budget for retrieved passages in the answer prompt
+    answer_window_messages: int = 4 # Most recent interview messages sent with each answer and search query
+    section_context_tokens: int = 3000 # Token budget for the source digest used to write a section
+    early_stop: bool = False # Opt in to end an interview once a turn adds no new documents or little new in its answer
+    min_answer_novelty: float = 0.3 # Share of an answer that must be new against earlier answers to keep going
+    interview_failure_policy: str = "fail" # Once interview_retry_policy runs out of attempts: "fail" the run, or "skip" the interview and report on the rest
+    interview_schedule: str = "longest_first" # Interview launch order: "longest_first" by estimated cost, or "fifo"
+    prefetch: bool = False # Run each interview's first question and retrieval while the analysts are reviewed
+
+    @classmethod
+    def from_runnable_config(
+        cls, config: Optional[RunnableConfig] = None
+    ) -> "Configuration":
+        """Create a Configuration instance from a RunnableConfig."""
+        configurable = (
+            config["configurable"] if config and "configurable" in config else {}
+        )
+        values: dict[str, Any] = {
+            f.name: _parse(f.type, os.environ.get(f.name.upper(), configurable.get(f.name)))
+            for f in fields(cls)
+            if f.init
+        }
+        return cls(**{k: v for k, v in values.items() if v is not None})
+
+def _parse(field_type: type, value: Any) -> Any:
+    """Convert values read from environment variables (always strings) to the field type."""
+    if not isinstance(value, str) or field_type is str:
+        return value
+    if field_type is bool:
+        return value.lower() in ("1", "true", "yes")
+    return field_type(value)
@@ -0,0 +1,242 @@
+import math
+import re
+import threading
+from collections import Counter, OrderedDict, defaultdict
+from dataclasses import dataclass
+from typing import Hashable
+
+# Rough characters-per-token ratio used to budget the packed context without a tokenizer
+chars_per_token = 4
+
+# Target passage length in words
+passage_words = 120
+
+# Word n-gram length for near-duplicate detection, and the Jaccard similarity above which
+# a passage counts as a duplicate of one already indexed
+shingle_size = 5
+duplicate_threshold = 0.6
+
+stopwords = frozenset("""a an and are as at be but by for from has have in is it its of on or that the
+their this to was were which with what who how why when where will would can do does""".split())
+
+document_pattern = re.compile(r"<Document ([^>]*?)/>\n(.*?)\n</Document>", re.DOTALL)
+
+def tokenize(text: str) -> list[str]:
+    return [t for t in re.findall(r"\w+", text.lower()) if t not in stopwords]
+
+def parse_documents(context) -> list[tuple[str, str]]:
+    """Split formatted context entries back into (Document tag attributes, text) pairs.
+
+    Text outside a <Document> tag (for example a plain string added to context) is kept as
+    a document without attributes.
+    """
+    documents = []
+    for entry in context:
+        entry = str(entry)
+        matches = list(document_pattern.finditer(entry))
+        if not matches:
+            if entry.strip():
+                documents.append(("", entry.strip()))
+            continue
+        documents.extend((m.group(1), m.group(2)) for m in matches)
+    return documents
+
+def split_passages(text: str) -> list[str]:
+    """Split text into passages of about passage_words words, on paragraph boundaries where possible."""
+    passages, current, length = [], [], 0
+    for paragraph in re.split(r"\n\s*\n|\n", text):
+        words = paragraph.split()
+        # Break up paragraphs that are longer than a passage on their own
+        while len(words) > passage_words:
+            if current:
+                passages.append(" ".join(current))
+                current, length = [], 0
+            passages.append(" ".join(words[:passage_words]))
+            words = words[passage_words:]
+        if not words:
+            continue
+        if length + len(words) > passage_words and current:
+            passages.append(" ".join(current))
+            current, length = [], 0
+        current.extend(words)
+        length += len(words)
+    if current:
+        passages.append(" ".join(current))
+    return passages
+
+def shingles(tokens: list[str]) -> set:
+    if len(tokens) < shingle_size:
+        return {tuple(tokens)}
+    return {tuple(tokens[i:i + shingle_size]) for i in range(len(tokens) - shingle_size + 1)}
+
+def jaccard(a: set, b: set) -> float:
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+def novelty(text: str, previous) -> float:
+    """Share of the word shingles of text that appear in none of the previous texts (1.0 if there are none)."""
+    text_shingles = shingles(tokenize(text))
+    seen = set()
+    for other in previous:
+        seen |= shingles(tokenize(other))
+    if not text_shingles or not seen:
+        return 1.0
+    return len(text_shingles - seen) / len(text_shingles)
+
+def estimate_tokens(text: str) -> int:
+    return len(text) // chars_per_token
+
+@dataclass
+class Passage:
+    document: int # Position of the source document in the index
+    position: int # Position of the passage within its document
+    header: str # Attributes of the source <Document> tag
+    text: str
+    term_counts: Counter
+    length: int
+
+class PassageIndex:
+    """In-process BM25 index over deduplicated passages of retrieved documents.
+
+    Documents can be added incrementally; near-duplicate passages (by word shingles) are dropped
+    on the way in, through an inverted shingle index so each new passage is only compared with
+    passages that share a shingle with it.
+    """
+
+    k1 = 1.5
+    b = 0.75
+
+    def __init__(self, context=()):
+        self.passages: list[Passage] = []
+        self.document_frequency = Counter()
+        self.total_length = 0
+        self.headers: dict[str, int] = {}
+        self.duplicates = 0
+        self._shingles: list[set] = []
+        self._shingle_index = defaultdict(list)
+        self.add(context)
+
+    def add(self, context) -> None:
+        """Index the documents in formatted context entries."""
+        for header, text in parse_documents(context):
+            document = self.headers.setdefault(header or f"#{len(self.headers)}", len(self.headers))
+            for position, passage in enumerate(split_passages(text)):
+                self._add_passage(document, position, header, passage)
+
+    def _add_passage(self, document: int, position: int, header: str, text: str) -> None:
+        tokens = tokenize(text)
+        passage_shingles = shingles(tokens)
+        overlaps = Counter(j for s in passage_shingles for j in self._shingle_index[s])
+        for j, shared in overlaps.items():
+            union = len(passage_shingles) + len(self._shingles[j]) - shared
+            if shared / union >= duplicate_threshold:
+                self.duplicates += 1
+                return
+
+        i = len(self.passages)
+        for s in passage_shingles:
+            self._shingle_index[s].append(i)
+        self._shingles.append(passage_shingles)
+
+        term_counts = Counter(tokens)
+        self.document_frequency.update(term_counts.keys())
+        self.total_length += len(tokens)
+        self.passages.append(Passage(document, position, header, text, term_counts, len(tokens)))
+
+    def scores(self, query: str) -> list[float]:
+        """BM25 score of every passage against query."""
+        if not self.passages:
+            return []
+        n = len(self.passages)
+        average_length = self.total_length / n or 1
+        terms = set(tokenize(query))
+        idf = {
+            t: math.log(1 + (n - self.document_frequency[t] + 0.5) / (self.document_frequency[t] + 0.5))
+            for t in terms
+        }
+        scores = []
+        for p in self.passages:
+            norm = self.k1 * (1 - self.b + self.b * p.length / average_length)
+            scores.append(sum(
+                idf[t] * p.term_counts[t] * (self.k1 + 1) / (p.term_counts[t] + norm)
+                for t in terms if t in p.term_counts
+            ))
+        return scores
+
+    def search(self, query: str, max_tokens: int) -> list[Passage]:
+        """The best passages for query, best first, that fit in max_tokens."""
+        ranked = sorted(zip(self.scores(query), range(len(self.passages))), key=lambda x: (-x[0], x[1]))
+        selected, budget = [], max_tokens
+        for _, i in ranked:
+            cost = estimate_tokens(self.passages[i].text)
+            if cost > budget:
+                continue
+            selected.append(self.passages[i])
+            budget -= cost
+        return selected
+
+    def pack(self, query: str, max_tokens: int) -> str:
+        """Format the best passages for query as <Document> blocks, within max_tokens.
+
+        Passages from the same document are grouped in their original order; documents are
+        ordered by their best passage.
+        """
+        by_document: dict[int, list[Passage]] = {}
+        for p in self.search(query, max_tokens):
+            by_document.setdefault(p.document, []).append(p)
+        blocks = []
+        for passages in by_document.values():
+            passages.sort(key=lambda p: p.position)
+            text = "\n...\n".join(p.text for p in passages)
+            header = passages[0].header
+            blocks.append(f"<Document {header}/>\n{text}\n</Document>" if header else text)
+        return "\n\n---\n\n".join(blocks)
+
+def pack_context(context, query: str, max_tokens: int) -> str:
+    """Deduplicate, rank and pack retrieved context for query into at most max_tokens."""
+    return PassageIndex(context).pack(query, max_tokens)
+
+@dataclass
+class _CachedIndex:
+    index: PassageIndex
+    entries: tuple # Context entries indexed so far, in order
+
+class IndexCache:
+    """Reuse passage indexes across turns of the same conversation.
+
+    Indexes are kept per conversation key (for example run and analyst). When the context under a
+    key only grew since the last lookup (every previously indexed entry still in place, compared
+    by identity), just the new entries are indexed, so a turn costs the new documents rather than
+    the whole history. Any other context is indexed from scratch. At most max_size indexes are
+    kept, least recently used first out.
+    """
+
+    def __init__(self, max_size: int = 256):
+        self.max_size = max_size
+        self._entries: OrderedDict[Hashable, _CachedIndex] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, context) -> PassageIndex:
+        entries = tuple(context)
+        if not entries:
+            return PassageIndex()
+        with self._lock:
+            cached = self._entries.get(key)
+            if (cached is not None
+                    and len(cached.entries) <= len(entries)
+                    and all(a is b for a, b in zip(cached.entries, entries))):
+                self._entries.move_to_end(key)
+                cached.index.add(entries[len(cached.entries):])
+                cached.entries = entries
+                return cached.index
+
+            index = PassageIndex(entries)
+            self._entries[key] = _CachedIndex(index, entries)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+            return index
+
+# Shared by the graph nodes of this process
+index_cache = IndexCache()
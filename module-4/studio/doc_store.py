@@ -0,0 +1,104 @@
+import hashlib
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Callable, Iterable, Optional
+
+class DocumentStore:
+    """Content-addressed store for the documents retrieved during one run.
+
+    Documents are kept once and referred to by handle ("doc:" and a hash of the text), so graph
+    state can carry handles instead of full text. Each document can also be registered under a
+    source key (a URL or a Wikipedia title): later fetches of the same source resolve to the stored
+    handle, and concurrent fetches of one source wait for a single fetch.
+    """
+
+    def __init__(self):
+        self._texts: dict[str, str] = {}
+        self._sources: dict[str, str] = {}
+        self._pending: dict[str, Future] = {}
+        self._lock = threading.Lock()
+        self.hits = 0 # Fetches answered from the store
+
+    @staticmethod
+    def handle_for(text: str) -> str:
+        return "doc:" + hashlib.blake2b(text.encode(), digest_size=16).hexdigest()
+
+    def put(self, text: str, source: Optional[str] = None) -> str:
+        """Store text and return its handle. If source is already stored, its handle is returned instead."""
+        with self._lock:
+            if source is not None and source in self._sources:
+                self.hits += 1
+                return self._sources[source]
+            handle = self.handle_for(text)
+            self._texts.setdefault(handle, text)
+            if source is not None:
+                self._sources[source] = handle
+            return handle
+
+    def get_or_fetch(self, source: str, fetch: Callable[[], Optional[str]]) -> Optional[str]:
+        """Handle of the document for source, calling fetch() only if no branch has fetched it yet.
+
+        fetch returns the document text, or None when the source has no document; that is not stored.
+        """
+        with self._lock:
+            if source in self._sources:
+                self.hits += 1
+                return self._sources[source]
+            pending = self._pending.get(source)
+            if pending is None:
+                future = self._pending[source] = Future()
+            else:
+                self.hits += 1
+        if pending is not None:
+            return pending.result()
+
+        try:
+            text = fetch()
+            handle = None if text is None else self.put(text, source)
+            future.set_result(handle)
+            return handle
+        except Exception as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._pending.pop(source, None)
+
+    def get(self, handle: str) -> str:
+        with self._lock:
+            return self._texts[handle]
+
+    def resolve(self, handles: Iterable[str]) -> list[str]:
+        """Texts for handles, in order; the same handle always resolves to the same string object.
+
+        Handles of documents this store does not hold are skipped: a run resumed after its store was
+        released (or in another process) carries on with the documents it retrieves from then on.
+        """
+        with self._lock:
+            return [self._texts[h] for h in handles if h in self._texts]
+
+    def __len__(self):
+        return len(self._texts)
+
+# Max number of runs with a store; the least recently used store is released beyond that, so the stores
+# of runs that failed and were never resumed (and never reached pop_store) do not pile up
+max_stores = 64
+
+_stores: OrderedDict[Optional[str], DocumentStore] = OrderedDict()
+_stores_lock = threading.Lock()
+
+def get_store(store_id: Optional[str]) -> DocumentStore:
+    """The store for a run, created on first use (store_id None is a process-wide default store)."""
+    with _stores_lock:
+        store = _stores.get(store_id)
+        if store is None:
+            store = _stores[store_id] = DocumentStore()
+            while len(_stores) > max_stores:
+                _stores.popitem(last=False)
+        _stores.move_to_end(store_id)
+        return store
+
+def pop_store(store_id: Optional[str]) -> Optional[DocumentStore]:
+    with _stores_lock:
+        return _stores.pop(store_id, None)
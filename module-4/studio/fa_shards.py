@@ -0,0 +1,47 @@
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
+
+from log_ingest import LogChunk, read_chunk
+
+# Worker processes for sharded failure analysis (None: one per core)
+max_workers: Optional[int] = None
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+def shard_pool() -> ProcessPoolExecutor:
+    """The process pool shared by sharded failure analysis runs, started on first use.
+
+    Workers are spawned rather than forked: the graph runs its nodes on threads, and forking a
+    threaded process can leave locks held in the child.
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=max_workers or os.cpu_count(),
+                                        mp_context=multiprocessing.get_context("spawn"))
+        return _pool
+
+def shutdown_pool() -> None:
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown()
+            _pool = None
+
+def analyze_shard(partition: LogChunk) -> dict:
+    """Runs in a worker process: failure analysis of one partition, a byte range of the spooled log file.
+
+    Only the partition's file offsets come in and the (small) fa_summary / processed_logs go back,
+    so the logs themselves are never pickled between processes.
+    """
+    # Imported here, in the worker, since sub_graphs imports this module
+    from sub_graphs import LogBatch, columnar_logs, fa_graph
+
+    logs = read_chunk(partition)
+    if columnar_logs:
+        logs = LogBatch.from_logs(logs)
+    return fa_graph.invoke({"cleaned_logs": logs})
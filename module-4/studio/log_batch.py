@@ -0,0 +1,199 @@
+"""Columnar batches of logs for the sub_graphs log-analysis pipeline.
+
+A LogBatch keeps id, grade and grader as NumPy arrays, next to the original Log dicts that hold the
+free-text fields (question, docs, answer, feedback). Failure selection, grading stats and processed-log
+ids are then array operations instead of Python loops over Log dicts:
+
+    batch = LogBatch.from_logs(logs)
+    failures = batch.failures()
+    failures.processed_ids("failure-analysis-on-log-")
+
+NumPy is optional: without it, LogBatch.available is False and the pipeline keeps using lists.
+
+    python log_batch.py --logs 1000000
+"""
+import argparse
+import random
+import time
+from dataclasses import dataclass
+from typing import Any, ClassVar, Optional
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+@dataclass(frozen=True)
+class LogBatch:
+    ids: Any # str array
+    has_grade: Any # bool array: the log has a "grade" key, i.e. it is a failure
+    grades: Any # float array, NaN where the grade is missing or None
+    grader_codes: Any # int32 array of positions in graders, -1 where there is no grader
+    graders: tuple # Distinct grader names
+    rows: Any # int array: position of each log in logs
+    logs: list # The original Log dicts, holding the text fields; shared (not copied) by batches taken from this one
+
+    available: ClassVar[bool] = np is not None
+
+    @classmethod
+    def from_logs(cls, logs: list[dict]) -> "LogBatch":
+        if np is None:
+            raise ImportError("LogBatch needs numpy: pip install numpy")
+        n = len(logs)
+        # Grades and graders are only set on the few logs that were graded, so only those are read one by one
+        graded = [i for i, log in enumerate(logs) if "grade" in log or "grader" in log]
+        has_grade = np.zeros(n, dtype=bool)
+        grades = np.full(n, np.nan)
+        grader_codes = np.full(n, -1, dtype=np.int32)
+        graders: dict[str, int] = {}
+        if graded:
+            has_grade[graded] = ["grade" in logs[i] for i in graded]
+            grades[graded] = [np.nan if (g := logs[i].get("grade")) is None else g for i in graded]
+            grader_codes[graded] = [-1 if (g := logs[i].get("grader")) is None else graders.setdefault(g, len(graders))
+                                    for i in graded]
+        return cls(
+            ids=np.array([str(log["id"]) for log in logs], dtype=str),
+            has_grade=has_grade,
+            grades=grades,
+            grader_codes=grader_codes,
+            graders=tuple(graders),
+            rows=np.arange(n),
+            logs=logs,
+        )
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def take(self, indices) -> "LogBatch":
+        """The logs at indices (an int array), in that order."""
+        return LogBatch(
+            ids=self.ids[indices],
+            has_grade=self.has_grade[indices],
+            grades=self.grades[indices],
+            grader_codes=self.grader_codes[indices],
+            graders=self.graders,
+            rows=self.rows[indices],
+            logs=self.logs,
+        )
+
+    def failures(self) -> "LogBatch":
+        """Logs that contain a failure (a grade), like get_failures on a list of logs."""
+        return self.take(np.flatnonzero(self.has_grade))
+
+    def column(self, field: str) -> list:
+        """Values of a text field for the logs of this batch (None where a log does not have it)."""
+        logs = self.logs
+        return [logs[row].get(field) for row in self.rows.tolist()]
+
+    def grade_stats(self) -> dict:
+        """Failure counts and mean grade, overall and per grader."""
+        graded = ~np.isnan(self.grades)
+        codes = self.grader_codes + 1 # 0 is "no grader"
+        size = len(self.graders) + 1
+        failures = np.bincount(codes, weights=self.has_grade, minlength=size)
+        grade_sums = np.bincount(codes[graded], weights=self.grades[graded], minlength=size)
+        graded_counts = np.bincount(codes[graded], minlength=size)
+        names = (None,) + self.graders
+        return {
+            "logs": len(self),
+            "failures": int(self.has_grade.sum()),
+            "mean_grade": float(self.grades[graded].mean()) if graded.any() else None,
+            "by_grader": {
+                names[i]: {"failures": int(failures[i]),
+                           "mean_grade": float(grade_sums[i] / graded_counts[i]) if graded_counts[i] else None}
+                for i in range(size) if failures[i] or graded_counts[i]
+            },
+        }
+
+    def processed_ids(self, prefix: str):
+        """prefix + id for every log (e.g. "summary-on-log-<id>"), as a str array.
+
+        The array is filled through its UTF-32 code points: prefix in the leading columns, the ids
+        (already padded with NULs to a fixed width) in the rest, with no per-log Python string.
+        """
+        n, width = len(self.ids), self.ids.dtype.itemsize // 4
+        out = np.empty(n, dtype=f"<U{len(prefix) + width}")
+        code_points = out.view(np.uint32).reshape(n, len(prefix) + width)
+        code_points[:, :len(prefix)] = np.frombuffer(prefix.encode("utf-32-le"), dtype=np.uint32)
+        code_points[:, len(prefix):] = self.ids.view(np.uint32).reshape(n, width)
+        return out
+
+    def to_logs(self) -> list[dict]:
+        """The Log dicts of this batch."""
+        logs = self.logs
+        return [logs[row] for row in self.rows.tolist()]
+
+def grade_stats(logs: list[dict]) -> dict:
+    """LogBatch.grade_stats for a list of Log dicts."""
+    by_grader: dict[Optional[str], dict] = {}
+    grades = []
+    for log in logs:
+        stats = by_grader.setdefault(log.get("grader"), {"failures": 0, "grades": []})
+        stats["failures"] += "grade" in log
+        if log.get("grade") is not None:
+            stats["grades"].append(log["grade"])
+            grades.append(log["grade"])
+    return {
+        "logs": len(logs),
+        "failures": sum(s["failures"] for s in by_grader.values()),
+        "mean_grade": sum(grades) / len(grades) if grades else None,
+        "by_grader": {
+            grader: {"failures": s["failures"], "mean_grade": sum(s["grades"]) / len(s["grades"]) if s["grades"] else None}
+            for grader, s in by_grader.items() if s["failures"] or s["grades"]
+        },
+    }
+
+def fake_logs(n: int, failure_rate: float = 0.1, seed: int = 0) -> list[dict]:
+    rng = random.Random(seed)
+    graders = ["human", "llm-judge", "heuristic"]
+    logs = []
+    for i in range(n):
+        log = {"id": str(i), "question": f"question {i}", "docs": None, "answer": f"answer {i}"}
+        if rng.random() < failure_rate:
+            log.update(grade=rng.randint(0, 1), grader=rng.choice(graders), feedback="wrong retrieval")
+        logs.append(log)
+    return logs
+
+def benchmark(n: int, failure_rate: float = 0.1) -> dict:
+    """Time failure selection, grading stats and processed-id generation on lists and on a LogBatch."""
+    logs = fake_logs(n, failure_rate)
+
+    def timed(func):
+        start = time.perf_counter()
+        result = func()
+        return result, time.perf_counter() - start
+
+    failures, list_failures = timed(lambda: [log for log in logs if "grade" in log])
+    stats, list_stats = timed(lambda: grade_stats(logs))
+    list_ids_result, list_ids = timed(lambda: [f"summary-on-log-{log['id']}" for log in logs])
+
+    batch, convert = timed(lambda: LogBatch.from_logs(logs))
+    batch_failures, batch_failures_time = timed(batch.failures)
+    batch_stats, batch_stats_time = timed(batch.grade_stats)
+    batch_ids_result, batch_ids = timed(lambda: batch.processed_ids("summary-on-log-"))
+    batch_ids_list_result, batch_ids_list = timed(batch_ids_result.tolist)
+    assert len(batch_failures) == len(failures) and batch_stats == stats and batch_ids_list_result == list_ids_result
+
+    results = {
+        "logs": n,
+        "failures": {"list": list_failures, "columnar": batch_failures_time},
+        "grade_stats": {"list": list_stats, "columnar": batch_stats_time},
+        "processed_ids": {"list": list_ids, "columnar": batch_ids},
+        "processed_ids_to_list": batch_ids_list,
+        "from_logs": convert,
+    }
+    for op in ("failures", "grade_stats", "processed_ids"):
+        print(f"{op:>14}: list {results[op]['list'] * 1000:8.1f} ms  columnar {results[op]['columnar'] * 1000:8.1f} ms")
+    print(f"{'ids as list':>14}: {batch_ids_list * 1000:8.1f} ms (where a list of str is needed)")
+    print(f"{'from_logs':>14}: {convert * 1000:8.1f} ms (once per batch)")
+    return results
+
+def main(argv: Optional[list[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Benchmark columnar log batches against lists of logs")
+    parser.add_argument("--logs", type=int, default=1_000_000)
+    parser.add_argument("--failure-rate", type=float, default=0.1)
+    args = parser.parse_args(argv)
+    benchmark(args.logs, args.failure_rate)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+import json
+import os
+import tempfile
+from typing import Iterable, Optional
+from typing_extensions import TypedDict
+
+class LogChunk(TypedDict):
+    path: str # JSONL file the chunk is read from
+    start: int # Byte offset of the chunk's first line (or, for a range from byte_ranges, anywhere in a line)
+    end: int # Byte offset just after the chunk's last line (or anywhere in a line)
+    index: int # Position of the chunk in the file
+
+# Compact JSON encoder for spooled logs: no spaces, and no check for circular references (logs are plain JSON data)
+_encode = json.JSONEncoder(check_circular=False, separators=(",", ":")).encode
+
+def spool(logs: Iterable[dict], path: Optional[str] = None) -> str:
+    """Write logs from any iterable (for example a generator over a log source) to a JSONL file, one at a time.
+
+    The file is removed if writing fails; once spool returns, deleting it is up to the caller.
+    """
+    if path is None:
+        fd, path = tempfile.mkstemp(prefix="logs-", suffix=".jsonl")
+        os.close(fd)
+    try:
+        with open(path, "w") as f:
+            for log in logs:
+                f.write(_encode(log) + "\n")
+    except BaseException:
+        os.remove(path)
+        raise
+    return path
+
+def chunk_file(path: str, chunk_size: int) -> list[LogChunk]:
+    """Split a JSONL file into chunks of chunk_size lines, without keeping any of them in memory."""
+    chunks = []
+    with open(path, "rb") as f:
+        start = offset = lines = 0
+        for line in f:
+            offset += len(line)
+            if line.strip():
+                lines += 1
+            if lines == chunk_size:
+                chunks.append(LogChunk(path=path, start=start, end=offset, index=len(chunks)))
+                start, lines = offset, 0
+        if lines:
+            chunks.append(LogChunk(path=path, start=start, end=offset, index=len(chunks)))
+    return chunks
+
+def byte_ranges(path: str, range_bytes: int) -> list[LogChunk]:
+    """Split a JSONL file into ranges of range_bytes bytes from its size alone, without reading it.
+
+    The ranges do not fall on line boundaries; read_chunk reads the lines that start in each one, so
+    the readers of the ranges (for example worker processes) find the boundaries themselves.
+    """
+    size = os.path.getsize(path)
+    return [LogChunk(path=path, start=start, end=min(start + range_bytes, size), index=index)
+            for index, start in enumerate(range(0, size, range_bytes))]
+
+def read_chunk(chunk: LogChunk) -> list[dict]:
+    """Load the logs of one chunk: the lines that start between its start and end offsets."""
+    with open(chunk["path"], "rb") as f:
+        start = chunk["start"]
+        if start:
+            # Skip the rest of a line that started before the chunk (nothing if start is at a line start)
+            f.seek(start - 1)
+            start += len(f.readline()) - 1
+        data = f.read(max(chunk["end"] - start, 0))
+        if data and not data.endswith(b"\n"):
+            # The last line starts in the chunk and ends after it
+            data += f.readline()
+    return [json.loads(line) for line in data.splitlines() if line.strip()]
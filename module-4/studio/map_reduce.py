@@ -1,21 +1,41 @@
-import operator
+import uuid
+from functools import partial
 from typing import Annotated
 from typing_extensions import TypedDict
 
 from pydantic import BaseModel
 
+from langchain_core.runnables import RunnableConfig
+
 from langchain_openai import ChatOpenAI 
 
 from langgraph.constants import Send
 from langgraph.graph import END, StateGraph, START
 
+from batching import MicroBatcher
+from rate_limit import FanOutScheduler, get_rate_limiter
+from reducers import extend_chunks
+from tournament import Tournament, get_tournament, pop_tournament, start_tournament
+
 # Prompts we will use
 subjects_prompt = """Generate a list of 3 sub-topics that are all related to this overall topic: {topic}."""
 joke_prompt = """Generate a joke about {subject}"""
 best_joke_prompt = """Below are a bunch of jokes about {topic}. Select the best one! Return the ID of the best one, starting 0 as the ID for the first joke. Jokes: \n\n  {jokes}"""
 
+# Provider limits, shared with every other graph in this process that calls gpt-4o
+rate_limiter = get_rate_limiter("openai:gpt-4o", tokens_per_request=200)
+
 # LLM
-model = ChatOpenAI(model="gpt-4o", temperature=0) 
+model = ChatOpenAI(model="gpt-4o", temperature=0, rate_limiter=rate_limiter) 
+
+# Max number of generate_joke branches running at once; the rest queue
+joke_fan_out = FanOutScheduler(max_concurrency=8)
+
+# Concurrent generate_joke calls within this window (seconds) are sent to the model as one .batch()
+joke_batch_window = 0.05
+
+# Jokes compared per best_joke prompt; larger fan-outs are reduced over several rounds
+tournament_batch_size = 8
 
 # Define the state
 class Subjects(BaseModel):
@@ -27,33 +47,57 @@ class BestJoke(BaseModel):
 class OverallState(TypedDict):
     topic: str
     subjects: list
-    jokes: Annotated[list, operator.add]
+    jokes: Annotated[list, extend_chunks]
     best_selected_joke: str
+    tournament_id: str
+
+def judge_jokes(topic: str, jokes: list[str]) -> int:
+    prompt = best_joke_prompt.format(topic=topic, jokes="\n\n".join(jokes))
+    response = model.with_structured_output(BestJoke).invoke(prompt)
+    return response.id
 
 def generate_topics(state: OverallState):
     prompt = subjects_prompt.format(topic=state["topic"])
     response = model.with_structured_output(Subjects).invoke(prompt)
-    return {"subjects": response.subjects}
+
+    # Open the tournament now, so jokes are judged in batches while the others are still being written
+    tournament_id = str(uuid.uuid4())
+    start_tournament(tournament_id, partial(judge_jokes, state["topic"]), batch_size=tournament_batch_size)
+    return {"subjects": response.subjects, "tournament_id": tournament_id}
 
 class JokeState(TypedDict):
     subject: str
+    tournament_id: str
 
 class Joke(BaseModel):
     joke: str
 
-def generate_joke(state: JokeState):
+joke_batcher = MicroBatcher(model.with_structured_output(Joke),
+                            window=joke_batch_window,
+                            max_batch_size=joke_fan_out.max_concurrency)
+
+def generate_joke(state: JokeState, config: RunnableConfig):
     prompt = joke_prompt.format(subject=state["subject"])
-    response = model.with_structured_output(Joke).invoke(prompt)
+    with joke_fan_out.slot():
+        response = joke_batcher.invoke(prompt, config)
+    tournament = get_tournament(state.get("tournament_id"))
+    if tournament is not None:
+        tournament.submit(response.joke)
     return {"jokes": [response.joke]}
 
 def best_joke(state: OverallState):
-    jokes = "\n\n".join(state["jokes"])
-    prompt = best_joke_prompt.format(topic=state["topic"], jokes=jokes)
-    response = model.with_structured_output(BestJoke).invoke(prompt)
-    return {"best_selected_joke": state["jokes"][response.id]}
+    jokes = state["jokes"]
+    tournament = pop_tournament(state.get("tournament_id"))
+
+    # If the run was resumed in another process or a branch was retried, replay the tournament from state
+    if tournament is None or tournament.submitted != len(jokes):
+        tournament = Tournament(partial(judge_jokes, state["topic"]), batch_size=tournament_batch_size)
+        for joke in jokes:
+            tournament.submit(joke)
+    return {"best_selected_joke": tournament.winner()}
 
 def continue_to_jokes(state: OverallState):
-    return [Send("generate_joke", {"subject": s}) for s in state["subjects"]]
+    return [Send("generate_joke", {"subject": s, "tournament_id": state.get("tournament_id")}) for s in state["subjects"]]
 
 # Construct the graph: here we put everything together to construct our graph
 graph_builder = StateGraph(OverallState)
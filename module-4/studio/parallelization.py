@@ -1,39 +1,39 @@
-import operator
 from typing import Annotated
 from typing_extensions import TypedDict
 
-from langchain_core.documents import Document
 from langchain_core.messages import HumanMessage, SystemMessage
-
-from langchain_community.document_loaders import WikipediaLoader
-from langchain_community.tools import TavilySearchResults
+from langchain_core.runnables import RunnableConfig
 
 from langchain_openai import ChatOpenAI
 
 from langgraph.graph import StateGraph, START, END
 
-llm = ChatOpenAI(model="gpt-4o", temperature=0) 
+import configuration
+from context_packing import pack_context
+from rate_limit import get_rate_limiter
+from reducers import extend_chunks
+from retrieval import format_web_docs, format_wikipedia_docs, gather_first_k, load_wikipedia, search_tavily
+
+# Shares the gpt-4o request and token limits with the other graphs of this process
+rate_limiter = get_rate_limiter("openai:gpt-4o", tokens_per_request=2000)
+
+llm = ChatOpenAI(model="gpt-4o", temperature=0, rate_limiter=rate_limiter) 
 
 class State(TypedDict):
     question: str
     answer: str
-    context: Annotated[list, operator.add]
+    context: Annotated[list, extend_chunks]
+    dropped_sources: list # Retrieval sources left out of the answer, and why
 
 def search_web(state):
     
     """ Retrieve docs from web search """
 
     # Search
-    tavily_search = TavilySearchResults(max_results=3)
-    search_docs = tavily_search.invoke(state['question'])
+    search_docs = search_tavily(state['question'], max_results=3)
 
      # Format
-    formatted_search_docs = "\n\n---\n\n".join(
-        [
-            f'<Document href="{doc["url"]}"/>\n{doc["content"]}\n</Document>'
-            for doc in search_docs
-        ]
-    )
+    formatted_search_docs = format_web_docs(search_docs)
 
     return {"context": [formatted_search_docs]} 
 
@@ -42,27 +42,42 @@ def search_wikipedia(state):
     """ Retrieve docs from wikipedia """
 
     # Search
-    search_docs = WikipediaLoader(query=state['question'], 
-                                  load_max_docs=2).load()
+    search_docs = load_wikipedia(state['question'], load_max_docs=2)
 
      # Format
-    formatted_search_docs = "\n\n---\n\n".join(
-        [
-            f'<Document source="{doc.metadata["source"]}" page="{doc.metadata.get("page", "")}"/>\n{doc.page_content}\n</Document>'
-            for doc in search_docs
-        ]
-    )
+    formatted_search_docs = format_wikipedia_docs(search_docs)
 
     return {"context": [formatted_search_docs]} 
 
-def generate_answer(state):
+def retrieve(state, config: RunnableConfig):
+
+    """ Query all sources in parallel; continue once enough have answered or the deadline passes """
+
+    # Get configuration
+    configurable = configuration.Configuration.from_runnable_config(config)
+
+    sources = {"search_web": search_web, "search_wikipedia": search_wikipedia}
+    results, dropped = gather_first_k({name: lambda fn=fn: fn(state) for name, fn in sources.items()},
+                                      k=configurable.retrieval_min_sources,
+                                      deadline=configurable.retrieval_deadline)
+
+    # Keep the context in source order, so the prompt does not depend on which source won the race
+    context = [doc for name in sources if name in results for doc in results[name]["context"]]
+    return {"context": context, "dropped_sources": dropped}
+
+def generate_answer(state, config: RunnableConfig):
     
     """ Node to answer a question """
 
+    # Get configuration
+    configurable = configuration.Configuration.from_runnable_config(config)
+
     # Get state
-    context = state["context"]
     question = state["question"]
 
+    # Keep only the passages most relevant to the question, without duplicates, within the token budget
+    context = pack_context(state["context"], question, configurable.answer_context_tokens)
+
     # Template
     answer_template = """Answer the question {question} using this context: {context}"""
     answer_instructions = answer_template.format(question=question, 
@@ -78,14 +93,11 @@ def generate_answer(state):
 builder = StateGraph(State)
 
 # Initialize each node with node_secret 
-builder.add_node("search_web",search_web)
-builder.add_node("search_wikipedia", search_wikipedia)
+builder.add_node("retrieve", retrieve)
 builder.add_node("generate_answer", generate_answer)
 
-# Flow
-builder.add_edge(START, "search_wikipedia")
-builder.add_edge(START, "search_web")
-builder.add_edge("search_wikipedia", "generate_answer")
-builder.add_edge("search_web", "generate_answer")
+# Flow: retrieve fans out to web search and Wikipedia itself, under a deadline
+builder.add_edge(START, "retrieve")
+builder.add_edge("retrieve", "generate_answer")
 builder.add_edge("generate_answer", END)
 graph = builder.compile()
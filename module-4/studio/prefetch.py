@@ -0,0 +1,51 @@
+import threading
+from concurrent.futures import CancelledError, Future, ThreadPoolExecutor
+from typing import Any, Callable, Optional
+
+class Prefetch:
+    """Speculative work started in the background, looked up later by key.
+
+    Each task runs at most once, on a pool of max_workers threads. A caller that needs a result
+    waits for its task if it is still running; a task that failed or was cancelled has no result,
+    and the caller does the work itself. Cancelling drops the queued tasks and the results of the
+    running ones.
+    """
+
+    def __init__(self, tasks: dict[str, Callable[[], Any]], max_workers: int = 4):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="prefetch")
+        self._futures: dict[str, Future] = {key: self._executor.submit(task) for key, task in tasks.items()}
+        self._executor.shutdown(wait=False)
+        self.cancelled = False
+
+    def result(self, key: str) -> Optional[Any]:
+        future = self._futures.get(key)
+        if future is None or self.cancelled:
+            return None
+        try:
+            return future.result()
+        except (CancelledError, Exception):
+            return None
+
+    def cancel(self) -> None:
+        self.cancelled = True
+        for future in self._futures.values():
+            future.cancel()
+
+_prefetches: dict[str, Prefetch] = {}
+_prefetches_lock = threading.Lock()
+
+def start_prefetch(prefetch_id: str, tasks: dict[str, Callable[[], Any]], **kwargs) -> Prefetch:
+    prefetch = Prefetch(tasks, **kwargs)
+    with _prefetches_lock:
+        _prefetches[prefetch_id] = prefetch
+    return prefetch
+
+def get_prefetch(prefetch_id: Optional[str]) -> Optional[Prefetch]:
+    with _prefetches_lock:
+        return _prefetches.get(prefetch_id)
+
+def cancel_prefetch(prefetch_id: Optional[str]) -> None:
+    with _prefetches_lock:
+        prefetch = _prefetches.pop(prefetch_id, None)
+    if prefetch is not None:
+        prefetch.cancel()
@@ -0,0 +1,202 @@
+"""Compact record of which logs each processor of the sub_graphs pipeline has handled.
+
+Instead of one "<processor>-on-log-<id>" string per log, ProcessedLogs keeps, per processor, the
+integer ids as sorted (start, stop) ranges, and only the ids that are not plain integers as
+strings. Consecutive log ids, the usual case, cost one range per processor however many logs there
+are, in state and in checkpoints. The strings are produced on demand:
+
+    processed = ProcessedLogs.of("summary", ["1", "2", "3"])
+    list(processed)  # ["summary-on-log-1", "summary-on-log-2", "summary-on-log-3"]
+
+    python processed_logs.py --logs 1000000
+"""
+import argparse
+import bisect
+import heapq
+from dataclasses import dataclass
+from typing import Iterable, Iterator, Optional
+
+from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+separator = "-on-log-"
+
+def _coalesce(ranges: Iterable) -> tuple:
+    """Non-overlapping (start, stop) ranges covering the same ids as ranges, which must be sorted."""
+    merged = []
+    for start, stop in ranges:
+        if merged and start <= merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], stop)
+        else:
+            merged.append([start, stop])
+    return tuple((start, stop) for start, stop in merged)
+
+def _int_ranges(ids) -> tuple[tuple, tuple]:
+    """Split ids into ranges of the canonical integer ids and a sorted tuple of the others."""
+    if np is not None and isinstance(ids, np.ndarray):
+        ids = ids.astype(str)
+        try:
+            ints = ids.astype(np.int64)
+        except (ValueError, OverflowError):
+            pass
+        else:
+            # "007" parses as 7 but would come back as "7", so it is kept as a string
+            canonical = ints.astype(str) == ids
+            unique = np.unique(ints[canonical])
+            breaks = np.flatnonzero(np.diff(unique) != 1) + 1
+            starts = unique[np.r_[0, breaks]] if len(unique) else unique
+            stops = unique[np.r_[breaks - 1, len(unique) - 1]] + 1 if len(unique) else unique
+            return tuple(zip(starts.tolist(), stops.tolist())), tuple(sorted(set(ids[~canonical].tolist())))
+        ids = ids.tolist()
+    ints, names = set(), set()
+    for id in map(str, ids):
+        try:
+            n = int(id)
+        except ValueError:
+            n = None
+        if n is not None and str(n) == id:
+            ints.add(n)
+        else:
+            names.add(id)
+    return _coalesce((n, n + 1) for n in sorted(ints)), tuple(sorted(names))
+
+def _join(left: tuple, right: tuple) -> tuple:
+    # Concatenate sorted ranges, merging the two at the seam if they touch
+    if left and right and left[-1][1] == right[0][0]:
+        return left[:-1] + ((left[-1][0], right[0][1]),) + right[1:]
+    return left + right
+
+def _merge_ranges(left: tuple, right: tuple) -> tuple:
+    if not left or not right:
+        return left or right
+    # Each chunk of logs covers its own span of ids, so right usually fits in one gap of left
+    # (whatever order the chunks finish in) and is spliced in without walking every range
+    i = bisect.bisect_left(left, right[0])
+    if (i == 0 or left[i - 1][1] <= right[0][0]) and (i == len(left) or right[-1][1] <= left[i][0]):
+        return _join(_join(left[:i], right), left[i:])
+    return _coalesce(heapq.merge(left, right))
+
+def _merge_names(left: tuple, right: tuple) -> tuple:
+    if not left or not right:
+        return left or right
+    if right[0] > left[-1]:
+        return left + right
+    return tuple(sorted(set(left) | set(right)))
+
+@dataclass(frozen=True, eq=False)
+class ProcessedLogs:
+    ranges: dict # Processor -> sorted (start, stop) ranges of integer log ids, stop excluded
+    names: dict # Processor -> sorted log ids that are not integers
+
+    def __post_init__(self):
+        # Values restored from a checkpoint come back with lists instead of tuples
+        object.__setattr__(self, "ranges", {p: tuple(tuple(r) for r in rs) for p, rs in self.ranges.items()})
+        object.__setattr__(self, "names", {p: tuple(ns) for p, ns in self.names.items()})
+
+    @classmethod
+    def of(cls, processor: str, ids) -> "ProcessedLogs":
+        """Record that processor handled the logs with these ids (an iterable or a NumPy str array)."""
+        ranges, names = _int_ranges(ids)
+        return cls({processor: ranges} if ranges else {}, {processor: names} if names else {})
+
+    @classmethod
+    def parse(cls, strings: Iterable[str]) -> "ProcessedLogs":
+        """From "<processor>-on-log-<id>" strings, the form processed_logs used to have."""
+        by_processor: dict[str, list] = {}
+        for string in strings:
+            processor, _, id = string.rpartition(separator)
+            by_processor.setdefault(processor, []).append(id)
+        processed = cls({}, {})
+        for processor, ids in by_processor.items():
+            processed = processed.merge(cls.of(processor, ids))
+        return processed
+
+    def merge(self, other: "ProcessedLogs") -> "ProcessedLogs":
+        ranges, names = dict(self.ranges), dict(self.names)
+        for processor, rs in other.ranges.items():
+            ranges[processor] = _merge_ranges(ranges.get(processor, ()), rs)
+        for processor, ns in other.names.items():
+            names[processor] = _merge_names(names.get(processor, ()), ns)
+        return ProcessedLogs(ranges, names)
+
+    @property
+    def processors(self) -> list[str]:
+        return list(dict.fromkeys([*self.ranges, *self.names]))
+
+    def ids(self, processor: str) -> Iterator[str]:
+        for start, stop in self.ranges.get(processor, ()):
+            yield from map(str, range(start, stop))
+        yield from self.names.get(processor, ())
+
+    def count(self, processor: str) -> int:
+        return sum(stop - start for start, stop in self.ranges.get(processor, ())) + len(self.names.get(processor, ()))
+
+    def __len__(self) -> int:
+        return sum(self.count(processor) for processor in self.processors)
+
+    def __iter__(self) -> Iterator[str]:
+        for processor in self.processors:
+            prefix = processor + separator
+            for id in self.ids(processor):
+                yield prefix + id
+
+    def __contains__(self, string: str) -> bool:
+        processor, _, id = string.rpartition(separator)
+        if id in self.names.get(processor, ()):
+            return True
+        try:
+            n = int(id)
+        except ValueError:
+            return False
+        return str(n) == id and any(start <= n < stop for start, stop in self.ranges.get(processor, ()))
+
+    def __eq__(self, other):
+        if isinstance(other, ProcessedLogs):
+            return self.ranges == other.ranges and self.names == other.names
+        return NotImplemented
+
+    def __repr__(self):
+        return f"ProcessedLogs({', '.join(f'{p}: {self.count(p)} logs' for p in self.processors)})"
+
+def merge_processed_logs(left, right) -> ProcessedLogs:
+    """Reducer for processed_logs channels. Also takes lists of "<processor>-on-log-<id>" strings."""
+    if not isinstance(left, ProcessedLogs):
+        left = ProcessedLogs.parse(left or ())
+    if not isinstance(right, ProcessedLogs):
+        right = ProcessedLogs.parse(right or ())
+    return left.merge(right)
+
+def benchmark(n: int, failure_rate: float = 0.1) -> dict:
+    """Checkpoint bytes of the processed_logs channel as a list of strings and as ProcessedLogs."""
+    from log_batch import fake_logs
+
+    logs = fake_logs(n, failure_rate)
+    ids = [log["id"] for log in logs]
+    failed = [log["id"] for log in logs if "grade" in log]
+    processed = ProcessedLogs.of("failure-analysis", failed).merge(ProcessedLogs.of("summary", ids))
+    strings = [f"failure-analysis-on-log-{id}" for id in failed] + [f"summary-on-log-{id}" for id in ids]
+    assert sorted(processed) == sorted(strings)
+
+    serde = JsonPlusSerializer()
+    results = {
+        "logs": n,
+        "list_bytes": len(serde.dumps_typed(strings)[1]),
+        "compact_bytes": len(serde.dumps_typed(processed)[1]),
+    }
+    print(f"{n:,} logs: list of strings {results['list_bytes']:,} bytes, "
+          f"ProcessedLogs {results['compact_bytes']:,} bytes")
+    return results
+
+def main(argv: Optional[list[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Checkpoint size of processed_logs, as strings and compacted")
+    parser.add_argument("--logs", type=int, default=1_000_000)
+    parser.add_argument("--failure-rate", type=float, default=0.1)
+    args = parser.parse_args(argv)
+    benchmark(args.logs, args.failure_rate)
+
+if __name__ == "__main__":
+    main()
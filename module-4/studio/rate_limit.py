@@ -0,0 +1,151 @@
+import asyncio
+import heapq
+import itertools
+import threading
+import time
+from contextlib import contextmanager
+
+from langchain_core.rate_limiters import BaseRateLimiter
+
+class TokenBucket:
+    """A bucket that refills continuously at refill_per_second, up to capacity."""
+
+    def __init__(self, capacity: float, refill_per_second: float):
+        self.capacity = capacity
+        self.refill_per_second = refill_per_second
+        self.available = capacity
+        self.updated = time.monotonic()
+
+    def refill(self, now: float) -> None:
+        self.available = min(self.capacity, self.available + (now - self.updated) * self.refill_per_second)
+        self.updated = now
+
+    def wait_time(self, amount: float) -> float:
+        """Seconds until amount can be taken (0 if it can be taken now)."""
+        amount = min(amount, self.capacity)
+        if self.available >= amount:
+            return 0.0
+        return (amount - self.available) / self.refill_per_second
+
+    def take(self, amount: float) -> None:
+        self.available -= min(amount, self.capacity)
+
+class ProviderRateLimiter(BaseRateLimiter):
+    """Requests-per-minute and tokens-per-minute limits shared by every caller of a provider.
+
+    Callers block until both buckets have room, so a burst of branches queues up instead of
+    turning into 429s and retries. Chat models call acquire() without knowing the size of the
+    request, so tokens_per_request is charged by default; pass tokens= to charge an exact estimate.
+    """
+
+    def __init__(self,
+                 requests_per_minute: float,
+                 tokens_per_minute: float = None,
+                 tokens_per_request: int = 1000):
+        self._lock = threading.Lock()
+        self.requests = TokenBucket(requests_per_minute, requests_per_minute / 60)
+        self.tokens = TokenBucket(tokens_per_minute, tokens_per_minute / 60) if tokens_per_minute else None
+        self.tokens_per_request = tokens_per_request
+
+    def _try_acquire(self, tokens: int) -> float:
+        """Take one request and the tokens if both are available; otherwise return the time to wait."""
+        with self._lock:
+            now = time.monotonic()
+            buckets = [(self.requests, 1)]
+            if self.tokens is not None:
+                buckets.append((self.tokens, tokens))
+            for bucket, _ in buckets:
+                bucket.refill(now)
+            wait = max(bucket.wait_time(amount) for bucket, amount in buckets)
+            if wait == 0:
+                for bucket, amount in buckets:
+                    bucket.take(amount)
+            return wait
+
+    def acquire(self, *, blocking: bool = True, tokens: int = None) -> bool:
+        tokens = self.tokens_per_request if tokens is None else tokens
+        while True:
+            wait = self._try_acquire(tokens)
+            if wait == 0:
+                return True
+            if not blocking:
+                return False
+            time.sleep(wait)
+
+    async def aacquire(self, *, blocking: bool = True, tokens: int = None) -> bool:
+        tokens = self.tokens_per_request if tokens is None else tokens
+        while True:
+            wait = self._try_acquire(tokens)
+            if wait == 0:
+                return True
+            if not blocking:
+                return False
+            await asyncio.sleep(wait)
+
+class ChargedRateLimiter(BaseRateLimiter):
+    """A caller's view of a shared ProviderRateLimiter that charges its own tokens per request."""
+
+    def __init__(self, limiter: ProviderRateLimiter, tokens_per_request: int):
+        self.limiter = limiter
+        self.tokens_per_request = tokens_per_request
+
+    def acquire(self, *, blocking: bool = True) -> bool:
+        return self.limiter.acquire(blocking=blocking, tokens=self.tokens_per_request)
+
+    async def aacquire(self, *, blocking: bool = True) -> bool:
+        return await self.limiter.aacquire(blocking=blocking, tokens=self.tokens_per_request)
+
+# Account limits per model / provider key. Defined only here, so every graph of the process shares
+# one limiter per key with the same limits
+provider_limits: dict[str, dict] = {
+    "openai:gpt-4o": {"requests_per_minute": 500, "tokens_per_minute": 30000},
+}
+
+_rate_limiters: dict[str, ProviderRateLimiter] = {}
+_rate_limiters_lock = threading.Lock()
+
+def get_rate_limiter(key: str, tokens_per_request: int = None) -> BaseRateLimiter:
+    """Return the shared limiter for key (e.g. "openai:gpt-4o"), built from provider_limits on first use.
+
+    tokens_per_request is what the caller's requests are charged against the shared token bucket
+    (the limiter's default when not given); it does not change the limits.
+    """
+    if key not in provider_limits:
+        raise KeyError(f"No rate limits configured for {key!r}; add them to rate_limit.provider_limits")
+    with _rate_limiters_lock:
+        if key not in _rate_limiters:
+            _rate_limiters[key] = ProviderRateLimiter(**provider_limits[key])
+        limiter = _rate_limiters[key]
+    return limiter if tokens_per_request is None else ChargedRateLimiter(limiter, tokens_per_request)
+
+class FanOutScheduler:
+    """Caps how many Send() branches of a graph run at once.
+
+    Each branch runs inside slot(); branches beyond max_concurrency wait for a free slot. A freed
+    slot goes to the waiting branch with the highest priority (for example, its estimated cost),
+    and to the one that asked first among equal priorities.
+    """
+
+    def __init__(self, max_concurrency: int):
+        self.max_concurrency = max_concurrency
+        self._free = max_concurrency
+        self._waiting = []
+        self._tickets = itertools.count()
+        self._cond = threading.Condition()
+
+    @contextmanager
+    def slot(self, priority: float = 0.0):
+        with self._cond:
+            ticket = (-priority, next(self._tickets))
+            heapq.heappush(self._waiting, ticket)
+            self._cond.wait_for(lambda: self._free > 0 and self._waiting[0] == ticket)
+            heapq.heappop(self._waiting)
+            self._free -= 1
+            # Another slot may still be free for the next waiter
+            self._cond.notify_all()
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._free += 1
+                self._cond.notify_all()
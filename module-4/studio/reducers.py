@@ -0,0 +1,305 @@
+import hashlib
+import sqlite3
+import threading
+from collections import OrderedDict
+from collections.abc import MutableMapping, Sequence
+from dataclasses import dataclass
+from functools import cached_property
+from itertools import chain
+
+from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer
+
+# Items per chunk: appends collect in an open tail, which is sealed into a chunk once it holds this many,
+# so wide fan-outs of single-item updates do not produce one chunk (and one checkpoint reference) per branch
+chunk_size = 64
+
+@dataclass(frozen=True, eq=False, repr=False)
+class ChunkedList(Sequence):
+    """A persistent, append-only sequence made of shared chunks.
+
+    Items are appended to an open tail of fewer than chunk_size items; when the tail fills up it is
+    sealed into a chunk, a plain tuple (plain, so that every checkpoint serializer can encode it) that
+    never changes again. Merging two values creates a new ChunkedList whose chunk tuple points at the
+    same chunk objects, so a merge copies one pointer per chunk and at most chunk_size items of tail
+    instead of every item.
+    It reads like a list: it can be indexed, sliced, iterated, joined and formatted into prompts.
+    """
+    chunks: tuple = () # Sealed chunks
+    tail: tuple = () # Items appended since the last chunk was sealed
+
+    def __post_init__(self):
+        # Values restored from a checkpoint come back as lists of lists
+        object.__setattr__(self, "chunks", tuple(
+            c if type(c) is tuple else tuple(c) for c in self.chunks if c
+        ))
+        object.__setattr__(self, "tail", tuple(self.tail))
+
+    @classmethod
+    def _from_chunks(cls, chunks: tuple, tail: tuple) -> "ChunkedList":
+        # Merges already hold tuples, so skip the normalization in __post_init__
+        value = object.__new__(cls)
+        object.__setattr__(value, "chunks", chunks)
+        object.__setattr__(value, "tail", tail)
+        return value
+
+    @cached_property
+    def _items(self) -> tuple:
+        return tuple(chain(chain.from_iterable(self.chunks), self.tail))
+
+    def __len__(self):
+        return sum(len(c) for c in self.chunks) + len(self.tail)
+
+    def __iter__(self):
+        return chain(chain.from_iterable(self.chunks), self.tail)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return list(self._items[index])
+        return self._items[index]
+
+    def __add__(self, other):
+        return extend_chunks(self, other)
+
+    def __radd__(self, other):
+        return list(other) + list(self)
+
+    def __eq__(self, other):
+        if isinstance(other, (ChunkedList, list, tuple)):
+            return list(self) == list(other)
+        return NotImplemented
+
+    def __repr__(self):
+        return repr(list(self))
+
+def extend_chunks(left, right) -> ChunkedList:
+    """Reducer for append-only list channels: a drop-in replacement for operator.add.
+
+    The items of each update are added to the open tail, which is sealed into chunks of chunk_size
+    items as it fills; sealed chunks are shared with the previous value, so an update copies at most
+    chunk_size items of tail plus its own items.
+    """
+    if not isinstance(left, ChunkedList):
+        left = extend_chunks(ChunkedList(), left) if left else ChunkedList()
+    if isinstance(right, ChunkedList):
+        # Seal the left tail as it is (a short chunk) so right's chunks can be shared
+        chunks = left.chunks + ((left.tail,) if left.tail else ()) + right.chunks
+        return ChunkedList._from_chunks(chunks, right.tail)
+    if not right:
+        return left
+    items = left.tail + tuple(right)
+    sealed = len(items) - len(items) % chunk_size
+    if not sealed:
+        return ChunkedList._from_chunks(left.chunks, items)
+    chunks = left.chunks + tuple(items[i:i + chunk_size] for i in range(0, sealed, chunk_size))
+    return ChunkedList._from_chunks(chunks, items[sealed:])
+
+@dataclass
+class ChunkRefs:
+    """Checkpoint form of a ChunkedList: the content keys of its sealed chunks, in order, and the open tail itself."""
+    keys: list
+    tail: list
+
+class SqliteChunkStore(MutableMapping):
+    """SQLite-backed chunk store for ChunkedSerializer, to go with a checkpointer that persists across restarts.
+
+    Give it its own database file rather than the checkpointer's: the checkpointer loads checkpoints
+    while holding its connection, so a second connection to the same file would wait on its locks.
+    """
+
+    def __init__(self, path: str):
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute("CREATE TABLE IF NOT EXISTS chunks (key TEXT PRIMARY KEY, type TEXT, data BLOB)")
+
+    def __getitem__(self, key: str) -> tuple[str, bytes]:
+        with self._lock:
+            row = self._conn.execute("SELECT type, data FROM chunks WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            raise KeyError(key)
+        return row[0], row[1]
+
+    def __setitem__(self, key: str, payload: tuple[str, bytes]) -> None:
+        with self._lock, self._conn:
+            self._conn.execute("INSERT OR IGNORE INTO chunks (key, type, data) VALUES (?, ?, ?)", (key, *payload))
+
+    def __delitem__(self, key: str) -> None:
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM chunks WHERE key = ?", (key,))
+
+    def __contains__(self, key) -> bool:
+        with self._lock:
+            return self._conn.execute("SELECT 1 FROM chunks WHERE key = ?", (key,)).fetchone() is not None
+
+    def __iter__(self):
+        with self._lock:
+            keys = [row[0] for row in self._conn.execute("SELECT key FROM chunks")]
+        return iter(keys)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM chunks").fetchone()[0]
+
+class ChunkedSerializer(JsonPlusSerializer):
+    """Checkpoint serializer that writes each chunk of a ChunkedList once.
+
+    ChunkedList values in a checkpoint are replaced by the content keys of their chunks; the chunk
+    payloads go to a separate key-value store, and only chunks not already in it are serialized.
+    A checkpoint then only adds the chunks sealed since the previous one, instead of the whole list;
+    the open tail (fewer than chunk_size items) is stored inline. Chunks stay in the store until
+    collect() finds that no checkpoint refers to them any more.
+
+    Pass a persistent mapping (for example a SqliteChunkStore) as store to keep chunks across restarts:
+
+        checkpointer = MemorySaver(serde=ChunkedSerializer())
+        graph = graph_builder.compile(checkpointer=checkpointer)
+    """
+
+    # Nesting depth searched for ChunkedList values: checkpoint -> channel_values -> value
+    max_depth = 3
+
+    # Chunks whose key is remembered, so shared chunks are not serialized again to find their key.
+    # Forgetting one only costs re-serializing it: keys are content hashes
+    max_known_chunks = 100_000
+
+    def __init__(self, store: MutableMapping = None, **kwargs):
+        super().__init__(**kwargs)
+        self.store = {} if store is None else store
+        # id(chunk) -> (chunk, key); the chunk is kept so its id cannot be reused while the entry exists
+        self._keys: OrderedDict[int, tuple[tuple, str]] = OrderedDict()
+        self._keys_lock = threading.Lock()
+        # Set by collect() in its own thread: chunk keys seen while reading checkpoints back
+        self._marking = threading.local()
+
+    def _remember(self, chunk: tuple, key: str) -> None:
+        with self._keys_lock:
+            self._keys[id(chunk)] = (chunk, key)
+            self._keys.move_to_end(id(chunk))
+            while len(self._keys) > self.max_known_chunks:
+                self._keys.popitem(last=False)
+
+    def _chunk_key(self, chunk: tuple) -> str:
+        with self._keys_lock:
+            known = self._keys.get(id(chunk))
+        if known is not None and known[0] is chunk:
+            return known[1]
+        payload = super().dumps_typed(list(chunk))
+        key = hashlib.blake2b(payload[1], digest_size=16).hexdigest()
+        if key not in self.store:
+            self.store[key] = payload
+        self._remember(chunk, key)
+        return key
+
+    def _load_chunk(self, key: str) -> tuple:
+        chunk = tuple(super().loads_typed(self.store[key]))
+        self._remember(chunk, key)
+        return chunk
+
+    def _externalize(self, obj, depth=0):
+        if isinstance(obj, ChunkedList):
+            return ChunkRefs([self._chunk_key(c) for c in obj.chunks], list(obj.tail))
+        if isinstance(obj, dict) and depth < self.max_depth:
+            return {k: self._externalize(v, depth + 1) for k, v in obj.items()}
+        return obj
+
+    def _internalize(self, obj, depth=0):
+        if isinstance(obj, ChunkRefs):
+            live = getattr(self._marking, "live", None)
+            if live is not None:
+                live.update(obj.keys)
+                return obj
+            return ChunkedList(tuple(self._load_chunk(k) for k in obj.keys), obj.tail)
+        if isinstance(obj, dict) and depth < self.max_depth:
+            return {k: self._internalize(v, depth + 1) for k, v in obj.items()}
+        return obj
+
+    def dumps_typed(self, obj):
+        return super().dumps_typed(self._externalize(obj))
+
+    def loads_typed(self, data):
+        return self._internalize(super().loads_typed(data))
+
+    def collect(self, checkpointer) -> int:
+        """Delete the chunks that no checkpoint (or pending write) of checkpointer refers to.
+
+        Mark and sweep: every checkpoint is read back with its chunk references left unresolved, so
+        no chunk is loaded, and the stored chunks that were not referenced are deleted. checkpointer
+        must use this serializer. Run it while no graph writes to checkpointer, for example after
+        deleting threads or between batches: a checkpoint written meanwhile could refer to a chunk
+        that is being swept. Returns the number of chunks deleted.
+        """
+        self._marking.live = live = set()
+        try:
+            for _ in checkpointer.list(None):
+                pass
+        finally:
+            self._marking.live = None
+        dead = [key for key in list(self.store) if key not in live]
+        for key in dead:
+            del self.store[key]
+        dead = set(dead)
+        with self._keys_lock:
+            for chunk_id in [i for i, (_, key) in self._keys.items() if key in dead]:
+                del self._keys[chunk_id]
+        return len(dead)
+
+def check_round_trip() -> None:
+    """Check that ChunkedList values survive the default serializer, ChunkedSerializer and a MemorySaver graph run,
+    and that ChunkedSerializer stores only sealed chunks and collects the ones no checkpoint refers to.
+
+    On langgraph 0.2.x the 300-branch fan-out can print "cannot schedule new futures after shutdown":
+    a race in langgraph's runner, which saves a finished branch's writes after the run has closed its
+    executor. It happens with operator.add and the default serializer too, and does not affect the state.
+    """
+    from operator import add
+    from typing import Annotated
+
+    from langgraph.checkpoint.memory import MemorySaver
+    from langgraph.constants import Send
+    from langgraph.graph import END, START, StateGraph
+    from typing_extensions import TypedDict
+
+    value = extend_chunks(extend_chunks([], list(range(100))), [{"a": 1}, "b", [2, 3]])
+    for serde in (JsonPlusSerializer(), ChunkedSerializer()):
+        restored = serde.loads_typed(serde.dumps_typed(value))
+        assert isinstance(restored, ChunkedList) and list(restored) == list(value), type(serde).__name__
+
+    class State(TypedDict):
+        items: Annotated[list, extend_chunks]
+        expected: Annotated[list, add]
+
+    def fan_out(state):
+        return [Send("append", {"items": [i], "expected": [i]}) for i in range(300)]
+
+    builder = StateGraph(State)
+    builder.add_node("append", lambda state: state)
+    builder.add_conditional_edges(START, fan_out, ["append"])
+    builder.add_edge("append", END)
+
+    for serde in (JsonPlusSerializer(), ChunkedSerializer()):
+        graph = builder.compile(checkpointer=MemorySaver(serde=serde))
+        config = {"configurable": {"thread_id": "check"}}
+        graph.invoke({"items": [], "expected": []}, config)
+        state = graph.get_state(config).values
+        assert isinstance(state["items"], ChunkedList) and list(state["items"]) == state["expected"], type(serde).__name__
+
+    # One-item updates only fill the tail, so the store holds one chunk per chunk_size items
+    builder = StateGraph(State)
+    builder.add_node("noop", lambda state: {})
+    builder.add_edge(START, "noop")
+    builder.add_edge("noop", END)
+    serde = ChunkedSerializer()
+    checkpointer = MemorySaver(serde=serde)
+    graph = builder.compile(checkpointer=checkpointer)
+    config = {"configurable": {"thread_id": "updates"}}
+    for i in range(100):
+        graph.invoke({"items": [i], "expected": []}, config)
+    assert list(graph.get_state(config).values["items"]) == list(range(100))
+    assert len(serde.store) == 100 // chunk_size, len(serde.store)
+    serde.store["unreferenced"] = serde.dumps_typed([])
+    assert serde.collect(checkpointer) == 1 and len(serde.store) == 100 // chunk_size
+    assert list(graph.get_state(config).values["items"]) == list(range(100))
+    print("ChunkedList round-trips through JsonPlusSerializer, ChunkedSerializer and MemorySaver")
+
+if __name__ == "__main__":
+    check_round_trip()
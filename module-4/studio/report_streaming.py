@@ -0,0 +1,83 @@
+from typing import Iterator, Optional
+
+from langchain_core.messages import BaseMessage
+
+# Report writing nodes whose tokens are streamed, and the part of the report each one writes
+report_parts = {
+    "write_introduction": "introduction",
+    "write_report": "content",
+    "write_conclusion": "conclusion",
+}
+
+def assemble_report(introduction: str, content: str, conclusion: str) -> str:
+    """Combine the introduction, report body and conclusion, moving the body's sources to the end."""
+    content = content.removeprefix("## Insights")
+    sources = None
+    if "## Sources" in content:
+        try:
+            content, sources = content.split("\n## Sources\n")
+        except ValueError:
+            # The header is not on a line of its own, or appears more than once: leave the body as it is
+            pass
+
+    final_report = introduction + "\n\n---\n\n" + content + "\n\n---\n\n" + conclusion
+    if sources is not None:
+        final_report += "\n\n## Sources\n" + sources
+    return final_report
+
+class ReportAssembler:
+    """Build the research report incrementally from a research_assistant stream.
+
+    Feed it the (mode, chunk) items of a stream with stream_mode=["custom", "messages", "updates"].
+    Sections arrive as their interviews finish; the introduction, body and conclusion arrive token by
+    token. render() returns the report as far as it has been written.
+    """
+
+    def __init__(self):
+        self.sections: list[dict] = []
+        self.parts = dict.fromkeys(report_parts.values(), "")
+        self.final_report: Optional[str] = None
+
+    def add(self, mode: str, chunk) -> Optional[dict]:
+        """Take one stream item and return the report event it carries, or None.
+
+        Events are {"type": "section", "analyst", "section"}, {"type": "token", "part", "text"}
+        and {"type": "final_report", "text"}.
+        """
+        if mode == "custom" and isinstance(chunk, dict) and chunk.get("type") == "section":
+            self.sections.append(chunk)
+            return chunk
+
+        if mode == "messages":
+            message, metadata = chunk
+            part = report_parts.get(metadata.get("langgraph_node"))
+            if part is not None and isinstance(message, BaseMessage) and message.content:
+                self.parts[part] += message.content
+                return {"type": "token", "part": part, "text": message.content}
+
+        if mode == "updates":
+            for update in chunk.values():
+                if isinstance(update, dict) and "final_report" in update:
+                    self.final_report = update["final_report"]
+                    return {"type": "final_report", "text": self.final_report}
+
+        return None
+
+    def render(self) -> str:
+        if self.final_report is not None:
+            return self.final_report
+        # Until the report writers start, the finished sections are the report so far
+        if not any(self.parts.values()):
+            return "\n\n".join(s["section"] for s in self.sections)
+        return assemble_report(**self.parts)
+
+def stream_report(graph, input, config=None, assembler: Optional[ReportAssembler] = None) -> Iterator[dict]:
+    """Run the research graph and yield report events as soon as they happen.
+
+    Pass an assembler to render the report in progress between events.
+    """
+    assembler = assembler if assembler is not None else ReportAssembler()
+    for mode, chunk in graph.stream(input, config, stream_mode=["custom", "messages", "updates"]):
+        event = assembler.add(mode, chunk)
+        if event is not None:
+            yield event
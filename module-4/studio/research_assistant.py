@@ -1,19 +1,52 @@
-import operator
+import inspect
+import os
+import time
+import uuid
+from functools import partial
+
 from pydantic import BaseModel, Field
-from typing import Annotated, List
+from typing import Annotated, Callable, List, Optional, Union
 from typing_extensions import TypedDict
 
-from langchain_community.document_loaders import WikipediaLoader
-from langchain_community.tools.tavily_search import TavilySearchResults
 from langchain_core.messages import AIMessage, HumanMessage, SystemMessage, get_buffer_string
+from langchain_core.runnables import RunnableConfig
 from langchain_openai import ChatOpenAI
 
 from langgraph.constants import Send
 from langgraph.graph import END, MessagesState, START, StateGraph
+from langgraph.types import RetryPolicy, StreamWriter
+
+import configuration
+from branch_results import BranchResults
+from context_packing import estimate_tokens, index_cache, novelty
+from doc_store import get_store, pop_store
+from prefetch import cancel_prefetch, get_prefetch, start_prefetch
+from rate_limit import get_rate_limiter
+from reducers import extend_chunks
+from report_streaming import assemble_report
+from scheduling import longest_first, makespan_report, node_timings
+from retrieval import format_web_docs, format_wikipedia_docs, load_wikipedia_page, search_tavily, search_wikipedia_titles
 
 ### LLM
 
-llm = ChatOpenAI(model="gpt-4o", temperature=0) 
+# Provider limits, shared with every other graph in this process that calls gpt-4o
+rate_limiter = get_rate_limiter("openai:gpt-4o", tokens_per_request=2000)
+
+llm = ChatOpenAI(model="gpt-4o", temperature=0, rate_limiter=rate_limiter) 
+
+# Max number of interviews (tasks of one step) running at once when the run config does not set max_concurrency;
+# the rest are started, in launch order, as running ones finish
+default_max_concurrency = 4
+
+# Attempts of an interview that raised, with exponential backoff in between. With a checkpointer, a retried
+# interview resumes from its last checkpoint on LangGraph 0.2; 0.3 runs the subgraph again from its input
+interview_retry_policy = RetryPolicy(max_attempts=3, initial_interval=2.0, backoff_factor=2.0, retry_on=Exception)
+
+# Completed interviews (and failed attempts), so a resumed or retried run only re-runs the ones that did not finish
+branch_results = BranchResults(os.environ.get(
+    "BRANCH_RESULTS_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), ".branch_results.sqlite"),
+))
 
 ### Schema 
 
@@ -44,13 +77,34 @@ class GenerateAnalystsState(TypedDict):
     max_analysts: int # Number of analysts
     human_analyst_feedback: str # Human feedback
     analysts: List[Analyst] # Analyst asking questions
+    max_num_turns: int # Number of turns of each interview (2 if not set)
+    doc_store_id: str # Document store for the interviews of these analysts
+    prefetch_id: str # Speculative first turns of the interviews, if prefetch is enabled
 
 class InterviewState(MessagesState):
     max_num_turns: int # Number turns of conversation
-    context: Annotated[list, operator.add] # Source docs
+    context: Annotated[list, extend_chunks] # Handles of source docs in the run's document store
+    doc_store_id: str # Document store shared by all interviews of the run
+    prefetch_id: str # Speculative first turns of the interviews, if prefetch is enabled
     analyst: Analyst # Analyst asking questions
     interview: str # Interview transcript
     sections: list # Final key we duplicate in outer state for Send() API
+    search_query: str # Search query for the current turn, shared by both retrievers
+    estimated_cost: float # Estimated run time of the interview, which sets its launch order
+    fifo_position: int # Position of the analyst in the analysts list
+    launch_position: int # Position of the interview in the launch order
+    turn_log: Annotated[list, extend_chunks] # Per-turn documents, answer novelty and tokens, for early stopping
+    interview_stats: list # Turns run and saved by early stopping, duplicated in outer state
+    started_at: float # When the interview started, for its measured duration
+    interview_error: str # Error of the step that failed the interview's last attempt, under the "skip" failure policy
+    failed_interviews: list # The interview, if it was left out of the report, duplicated in outer state
+    interview_schedule: list # Launch order, estimate and measured duration of the interview, duplicated in outer state
+
+class InterviewOutputState(TypedDict):
+    sections: list
+    interview_stats: list
+    failed_interviews: list
+    interview_schedule: list
 
 class SearchQuery(BaseModel):
     search_query: str = Field(None, description="Search query for retrieval.")
@@ -60,7 +114,14 @@ class ResearchGraphState(TypedDict):
     max_analysts: int # Number of analysts
     human_analyst_feedback: str # Human feedback
     analysts: List[Analyst] # Analyst asking questions
-    sections: Annotated[list, operator.add] # Send() API key
+    max_num_turns: int # Number of turns of each interview (2 if not set)
+    doc_store_id: str # Document store shared by all interviews of the run
+    prefetch_id: str # Speculative first turns of the interviews, if prefetch is enabled
+    sections: Annotated[list, extend_chunks] # Send() API key
+    interview_stats: Annotated[list, extend_chunks] # Turns and tokens per interview, and what early stopping saved
+    failed_interviews: Annotated[list, extend_chunks] # Interviews left out of the report under the "skip" failure policy
+    interview_schedule: Annotated[list, extend_chunks] # Launch order, estimate and measured duration of each interview
+    schedule_stats: dict # Makespan of the interview fan-out against FIFO launch order
     introduction: str # Introduction for the final report
     content: str # Content for the final report
     conclusion: str # Conclusion for the final report
@@ -83,10 +144,16 @@ analyst_instructions="""You are tasked with creating a set of AI analyst persona
 
 5. Assign one analyst to each theme."""
 
-def create_analysts(state: GenerateAnalystsState):
+def create_analysts(state: GenerateAnalystsState, config: RunnableConfig):
     
     """ Create analysts """
     
+    configurable = configuration.Configuration.from_runnable_config(config)
+
+    # Regenerating the analysts discards the work done for the previous ones
+    cancel_prefetch(state.get('prefetch_id'))
+    pop_store(state.get('doc_store_id'))
+
     topic=state['topic']
     max_analysts=state['max_analysts']
     human_analyst_feedback=state.get('human_analyst_feedback', '')
@@ -102,8 +169,16 @@ def create_analysts(state: GenerateAnalystsState):
     # Generate question 
     analysts = structured_llm.invoke([SystemMessage(content=system_message)]+[HumanMessage(content="Generate the set of analysts.")])
     
-    # Write the list of analysis to state
-    return {"analysts": analysts.analysts}
+    # Start the interviews' first turns while the analysts are being reviewed
+    prefetch_id = None
+    if configurable.prefetch:
+        prefetch_id = str(uuid.uuid4())
+        start_prefetch(prefetch_id,
+                       {analyst.persona: partial(prefetch_first_turn, topic, analyst) for analyst in analysts.analysts},
+                       max_workers=config.get("max_concurrency") or max(len(analysts.analysts), 1))
+
+    # Write the list of analysis to state, with a fresh document store for the interviews
+    return {"analysts": analysts.analysts, "doc_store_id": str(uuid.uuid4()), "prefetch_id": prefetch_id}
 
 def human_feedback(state: GenerateAnalystsState):
     """ No-op node that should be interrupted on """
@@ -128,6 +203,11 @@ When you are satisfied with your understanding, complete the interview with: "Th
 
 Remember to stay in character throughout your response, reflecting the persona and goals provided to you."""
 
+def prefetched_first_turn(state: InterviewState):
+    """ The speculative first turn of this interview, if one was prefetched """
+    prefetch = get_prefetch(state.get("prefetch_id"))
+    return prefetch.result(state["analyst"].persona) if prefetch is not None else None
+
 def generate_question(state: InterviewState):
 
     """ Node to generate a question """
@@ -136,6 +216,12 @@ def generate_question(state: InterviewState):
     analyst = state["analyst"]
     messages = state["messages"]
 
+    # The first question may already have been asked while the analysts were reviewed
+    if len(messages) == 1:
+        first_turn = prefetched_first_turn(state)
+        if first_turn is not None:
+            return {"messages": [first_turn["question"]]}
+
     # Generate question 
     system_message = question_instructions.format(goals=analyst.persona)
     question = llm.invoke([SystemMessage(content=system_message)]+messages)
@@ -154,51 +240,78 @@ Pay particular attention to the final question posed by the analyst.
 
 Convert this final question into a well-structured web search query""")
 
-def search_web(state: InterviewState):
-    
-    """ Retrieve docs from web search """
+def generate_search_query(state: InterviewState, config: RunnableConfig):
 
-    # Search
-    tavily_search = TavilySearchResults(max_results=3)
+    """ Write the search query for this turn once, for both retrievers """
+
+    configurable = configuration.Configuration.from_runnable_config(config)
+
+    # Reuse the prefetched query if the first question is the prefetched one
+    if len(state['messages']) == 2:
+        first_turn = prefetched_first_turn(state)
+        if first_turn is not None and state['messages'][-1].content == first_turn["question"].content:
+            return {"search_query": first_turn["search_query"]}
+
+    # Only the latest exchange matters for the query
+    messages = state['messages'][-configurable.answer_window_messages:]
 
     # Search query
     structured_llm = llm.with_structured_output(SearchQuery)
-    search_query = structured_llm.invoke([search_instructions]+state['messages'])
+    search_query = structured_llm.invoke([search_instructions]+messages)
+
+    return {"search_query": search_query.search_query}
+
+def new_handles(state: InterviewState, handles: list) -> list:
+    """ Handles not already in the interview context, without repeats """
+    seen = set(state.get("context", []))
+    return [h for h in dict.fromkeys(handles) if h is not None and h not in seen]
+
+def prefetch_first_turn(topic: str, analyst: Analyst) -> dict:
+
+    """ Speculatively run the first question and search query of an interview, and warm the retrieval cache with its results """
+
+    state = {"analyst": analyst, "messages": [first_message(topic)]}
+    question = generate_question(state)["messages"][0]
+    state["messages"] = state["messages"] + [question]
+    search_query = generate_search_query(state, {})["search_query"]
+
+    search_tavily(search_query, max_results=3)
+    for title in search_wikipedia_titles(search_query, max_results=2):
+        load_wikipedia_page(title)
+
+    return {"question": question, "search_query": search_query}
+
+def search_web(state: InterviewState):
     
+    """ Retrieve docs from web search """
+
+    store = get_store(state.get("doc_store_id"))
+
     # Search
-    search_docs = tavily_search.invoke(search_query.search_query)
-
-     # Format
-    formatted_search_docs = "\n\n---\n\n".join(
-        [
-            f'<Document href="{doc["url"]}"/>\n{doc["content"]}\n</Document>'
-            for doc in search_docs
-        ]
-    )
+    search_docs = search_tavily(state['search_query'], max_results=3)
+
+    # Store each doc once per run; a URL another interview already retrieved keeps its first copy
+    handles = [store.put(format_web_docs([doc]), source=doc["url"]) for doc in search_docs]
 
-    return {"context": [formatted_search_docs]} 
+    return {"context": new_handles(state, handles)} 
 
 def search_wikipedia(state: InterviewState):
     
     """ Retrieve docs from wikipedia """
 
-    # Search query
-    structured_llm = llm.with_structured_output(SearchQuery)
-    search_query = structured_llm.invoke([search_instructions]+state['messages'])
-    
+    store = get_store(state.get("doc_store_id"))
+
     # Search
-    search_docs = WikipediaLoader(query=search_query.search_query, 
-                                  load_max_docs=2).load()
-
-     # Format
-    formatted_search_docs = "\n\n---\n\n".join(
-        [
-            f'<Document source="{doc.metadata["source"]}" page="{doc.metadata.get("page", "")}"/>\n{doc.page_content}\n</Document>'
-            for doc in search_docs
-        ]
-    )
+    titles = search_wikipedia_titles(state['search_query'], max_results=2)
+
+    # Only load the pages no interview of this run has loaded yet
+    def load(title):
+        doc = load_wikipedia_page(title)
+        return None if doc is None else format_wikipedia_docs([doc])
 
-    return {"context": [formatted_search_docs]} 
+    handles = [store.get_or_fetch(f"wikipedia:{title}", partial(load, title)) for title in titles]
+
+    return {"context": new_handles(state, handles)} 
 
 # Generate expert answer
 answer_instructions = """You are an expert being interviewed by an analyst.
@@ -229,14 +342,21 @@ When answering questions, follow these guidelines:
         
 And skip the addition of the brackets as well as the Document source preamble in your citation."""
 
-def generate_answer(state: InterviewState):
+def generate_answer(state: InterviewState, config: RunnableConfig):
     
     """ Node to answer a question """
 
+    configurable = configuration.Configuration.from_runnable_config(config)
+
     # Get state
     analyst = state["analyst"]
-    messages = state["messages"]
-    context = state["context"]
+    messages = state["messages"][-configurable.answer_window_messages:]
+    question = messages[-1].content
+
+    # Only the passages relevant to the latest question, from the interview's passage index
+    context = get_store(state.get("doc_store_id")).resolve(state["context"])
+    index = index_cache.get((state.get("doc_store_id"), analyst.persona), context)
+    context = index.pack(f"{question} {state.get('search_query', '')}", configurable.answer_context_tokens)
 
     # Answer question
     system_message = answer_instructions.format(goals=analyst.persona, context=context)
@@ -244,27 +364,79 @@ def generate_answer(state: InterviewState):
             
     # Name the message as coming from the expert
     answer.name = "expert"
+
+    # Record what this turn added, for early stopping
+    turn_log = state.get("turn_log", [])
+    previous_answers = [m.content for m in state["messages"] if isinstance(m, AIMessage) and m.name == "expert"]
+    turn = {
+        "documents": len(state["context"]),
+        "new_documents": len(state["context"]) - (turn_log[-1]["documents"] if turn_log else 0),
+        "novelty": novelty(answer.content, previous_answers),
+        "tokens": message_tokens(state["messages"][-1]) + message_tokens(answer, system_message, messages),
+    }
     
     # Append it to state
-    return {"messages": [answer]}
+    return {"messages": [answer], "turn_log": [turn]}
+
+def message_tokens(message: AIMessage, *prompt) -> int:
+    """ Tokens used by the call that produced message, estimated from prompt and output if the model did not report usage """
+    usage = getattr(message, "usage_metadata", None)
+    if usage:
+        return usage["total_tokens"]
+    return estimate_tokens(get_buffer_string([message])) + sum(
+        estimate_tokens(p if isinstance(p, str) else get_buffer_string(p)) for p in prompt
+    )
 
-def save_interview(state: InterviewState):
+def early_stop_reason(state: InterviewState, configurable: configuration.Configuration) -> Optional[str]:
+    """ Why the interview has converged after its last turn, or None to keep going """
+    turn_log = state.get("turn_log", [])
+    if not configurable.early_stop or len(turn_log) < 2:
+        return None
+    if turn_log[-1]["new_documents"] == 0:
+        return "no new documents"
+    if turn_log[-1]["novelty"] < configurable.min_answer_novelty:
+        return "low answer novelty"
+    return None
+
+def save_interview(state: InterviewState, config: RunnableConfig):
     
     """ Save interviews """
 
+    configurable = configuration.Configuration.from_runnable_config(config)
+
     # Get messages
     messages = state["messages"]
     
     # Convert interview to a string
     interview = get_buffer_string(messages)
+
+    # Report the turns early stopping saved, priced at the average turn so far
+    turn_log = state.get("turn_log", [])
+    max_num_turns = state.get('max_num_turns', 2)
+    reason = early_stop_reason(state, configurable) if len(turn_log) < max_num_turns else None
+    turns_saved = max_num_turns - len(turn_log) if reason else 0
+    tokens = sum(turn["tokens"] for turn in turn_log)
+    stats = {
+        "analyst": state["analyst"].name,
+        "turns": len(turn_log),
+        "tokens": tokens,
+        "early_stop": reason,
+        "turns_saved": turns_saved,
+        "tokens_saved": turns_saved * tokens // max(len(turn_log), 1),
+    }
     
     # Save to interviews key
-    return {"interview": interview}
+    return {"interview": interview, "interview_stats": [stats]}
 
 def route_messages(state: InterviewState, 
+                   config: RunnableConfig,
                    name: str = "expert"):
 
     """ Route between question and answer """
+
+    # A step of this turn failed the interview
+    if state.get("interview_error"):
+        return "record_failure"
     
     # Get messages
     messages = state["messages"]
@@ -279,6 +451,10 @@ def route_messages(state: InterviewState,
     if num_responses >= max_num_turns:
         return 'save_interview'
 
+    # End once the interview stops turning up new sources or new answers
+    if early_stop_reason(state, configuration.Configuration.from_runnable_config(config)):
+        return 'save_interview'
+
     # This router is run after each question - answer pair 
     # Get the last question asked to check if it signals the end of discussion
     last_question = messages[-2]
@@ -339,14 +515,21 @@ There should be no redundant sources. It should simply be:
 - Include no preamble before the title of the report
 - Check that all guidelines have been followed"""
 
-def write_section(state: InterviewState):
+def write_section(state: InterviewState, config: RunnableConfig):
 
     """ Node to write a section """
 
+    configurable = configuration.Configuration.from_runnable_config(config)
+
     # Get state
     interview = state["interview"]
-    context = state["context"]
     analyst = state["analyst"]
+
+    # Deduplicated digest of the sources, ranked by the analyst focus and the questions asked
+    questions = " ".join(m.content for m in state["messages"] if isinstance(m, AIMessage) and m.name != "expert")
+    context = get_store(state.get("doc_store_id")).resolve(state["context"])
+    index = index_cache.get((state.get("doc_store_id"), analyst.persona), context)
+    context = index.pack(f"{analyst.description} {questions}", configurable.section_context_tokens)
    
     # Write section using either the gathered source docs from interview (context) or the interview itself (interview)
     system_message = section_writer_instructions.format(focus=analyst.description)
@@ -355,26 +538,151 @@ def write_section(state: InterviewState):
     # Append it to state
     return {"sections": [section.content]}
 
-# Add nodes and edges 
-interview_builder = StateGraph(InterviewState)
-interview_builder.add_node("ask_question", generate_question)
-interview_builder.add_node("search_web", search_web)
-interview_builder.add_node("search_wikipedia", search_wikipedia)
-interview_builder.add_node("answer_question", generate_answer)
-interview_builder.add_node("save_interview", save_interview)
-interview_builder.add_node("write_section", write_section)
+def interview_branch(state: InterviewState) -> str:
+    """ Key of the interview among the run's branches: the analyst's position, so analysts with the same name do not collide """
+    return f"interview:{state.get('fifo_position', 0)}"
+
+def start_interview(state: InterviewState, writer: StreamWriter):
+
+    """ Reuse the interview's result if it already completed in an earlier attempt of this run, otherwise start it """
+
+    # The document store id is unique to the run (and kept in its checkpoints), so it identifies the run
+    result = branch_results.get(state.get("doc_store_id"), interview_branch(state))
+    if result is None:
+        return {"started_at": time.time()}
+    for section in result["sections"]:
+        writer({"type": "section", "analyst": state["analyst"].name, "section": section})
+    return result
+
+def route_start(state: InterviewState):
+    """ End a reused interview right away """
+    return END if state.get("sections") else "ask_question"
+
+def finish_interview(state: InterviewState, writer: StreamWriter):
+
+    """ Keep the interview's result for retries of the run, stream its section and record how long it took """
+
+    analyst = state["analyst"]
+    branch_results.put(state.get("doc_store_id"), interview_branch(state),
+                       {"sections": state["sections"], "interview_stats": state["interview_stats"]})
+
+    # Stream the section now, rather than when every interview is done
+    for section in state["sections"]:
+        writer({"type": "section", "analyst": analyst.name, "section": section})
+    return {"interview_schedule": [{
+        "analyst": analyst.name,
+        "fifo_position": state.get("fifo_position", 0),
+        "launch_position": state.get("launch_position", 0),
+        "estimated_cost": state.get("estimated_cost", 0.0),
+        "duration": time.time() - state["started_at"],
+    }]}
+
+def record_failure(state: InterviewState):
+    """ Leave the interview out of the report, under the "skip" failure policy """
+    return {"failed_interviews": [{"analyst": state["analyst"].name, "error": state["interview_error"]}]}
+
+def capture_failure(state: InterviewState, config: RunnableConfig) -> bool:
+
+    """ Whether a step's error fails the interview rather than being raised for interview_retry_policy to retry it
+
+    Only under the "skip" failure policy, once the interview has failed as many times as the policy allows
+    attempts. Failures are counted in branch_results, so the count survives a resume in another process.
+    """
+
+    if configuration.Configuration.from_runnable_config(config).interview_failure_policy != "skip":
+        return False
+    run_id, branch = state.get("doc_store_id"), f"{interview_branch(state)}:failures"
+    failures = (branch_results.get(run_id, branch) or 0) + 1
+    branch_results.put(run_id, branch, failures)
+    return failures >= interview_retry_policy.max_attempts
+
+def interview_step(name: str, node: Callable) -> Callable:
+
+    """ Node running one step of an interview
+
+    The step is timed, to estimate the cost of future interviews, and skipped once the interview has failed.
+    An error the step captures (see capture_failure) is written to interview_error, which routes the
+    interview to record_failure.
+    """
+
+    timed = node_timings.timed(name, node)
+    takes_config = "config" in inspect.signature(node).parameters
+
+    def step(state: InterviewState, config: RunnableConfig):
+        if state.get("interview_error"):
+            return {}
+        try:
+            return timed(state, config) if takes_config else timed(state)
+        except Exception as e:
+            if not capture_failure(state, config):
+                raise
+            return {"interview_error": repr(e)}
+
+    return step
+
+def unless_failed(next_nodes: Union[str, list[str]]) -> Callable:
+    """ Edge to next_nodes, or to record_failure once a step of the interview has failed """
+    def route(state: InterviewState):
+        return "record_failure" if state.get("interview_error") else next_nodes
+    return route
+
+# Add nodes and edges
+interview_builder = StateGraph(InterviewState, output=InterviewOutputState)
+interview_builder.add_node("start_interview", start_interview)
+interview_builder.add_node("ask_question", interview_step("ask_question", generate_question))
+interview_builder.add_node("generate_search_query", interview_step("generate_search_query", generate_search_query))
+interview_builder.add_node("search_web", interview_step("search_web", search_web))
+interview_builder.add_node("search_wikipedia", interview_step("search_wikipedia", search_wikipedia))
+interview_builder.add_node("answer_question", interview_step("answer_question", generate_answer))
+interview_builder.add_node("save_interview", interview_step("save_interview", save_interview))
+interview_builder.add_node("write_section", interview_step("write_section", write_section))
+interview_builder.add_node("finish_interview", finish_interview)
+interview_builder.add_node("record_failure", record_failure)
 
 # Flow
-interview_builder.add_edge(START, "ask_question")
-interview_builder.add_edge("ask_question", "search_web")
-interview_builder.add_edge("ask_question", "search_wikipedia")
+interview_builder.add_edge(START, "start_interview")
+interview_builder.add_conditional_edges("start_interview", route_start, ["ask_question", END])
+interview_builder.add_conditional_edges("ask_question", unless_failed("generate_search_query"), ["generate_search_query", "record_failure"])
+interview_builder.add_conditional_edges("generate_search_query", unless_failed(["search_web", "search_wikipedia"]),
+                                        ["search_web", "search_wikipedia", "record_failure"])
 interview_builder.add_edge("search_web", "answer_question")
 interview_builder.add_edge("search_wikipedia", "answer_question")
-interview_builder.add_conditional_edges("answer_question", route_messages,['ask_question','save_interview'])
-interview_builder.add_edge("save_interview", "write_section")
-interview_builder.add_edge("write_section", END)
-
-def initiate_all_interviews(state: ResearchGraphState):
+interview_builder.add_conditional_edges("answer_question", route_messages,['ask_question','save_interview','record_failure'])
+interview_builder.add_conditional_edges("save_interview", unless_failed("write_section"), ["write_section", "record_failure"])
+interview_builder.add_conditional_edges("write_section", unless_failed("finish_interview"), ["finish_interview", "record_failure"])
+interview_builder.add_edge("finish_interview", END)
+interview_builder.add_edge("record_failure", END)
+interview_graph = interview_builder.compile()
+
+# Seconds per node assumed until the node has been timed in this process
+interview_node_defaults = {
+    "ask_question": 1.0,
+    "generate_search_query": 0.5,
+    "search_web": 1.0,
+    "search_wikipedia": 2.0,
+    "answer_question": 3.0,
+    "save_interview": 0.0,
+    "write_section": 5.0,
+}
+
+def estimate_interview_cost(analyst: Analyst, max_num_turns: int, mean_persona_length: float) -> float:
+
+    """ Estimated seconds for one interview, from the recorded node timings
+
+    Each turn asks, searches (both retrievers in parallel) and answers; the section is written once.
+    Model calls are scaled by how verbose the persona is compared to the others in the fan-out.
+    """
+
+    mean = lambda node: node_timings.mean(node, interview_node_defaults[node])
+    verbosity = len(analyst.persona) / mean_persona_length if mean_persona_length else 1.0
+    turn = (mean("ask_question") + mean("generate_search_query") + mean("answer_question")) * verbosity \
+        + max(mean("search_web"), mean("search_wikipedia"))
+    return max_num_turns * turn + mean("save_interview") + mean("write_section") * verbosity
+
+def first_message(topic: str) -> HumanMessage:
+    return HumanMessage(content=f"So you said you were writing an article on {topic}?")
+
+def initiate_all_interviews(state: ResearchGraphState, config: RunnableConfig):
 
     """ Conditional edge to initiate all interviews via Send() API or return to create_analysts """    
 
@@ -387,11 +695,26 @@ def initiate_all_interviews(state: ResearchGraphState):
     # Otherwise kick off interviews in parallel via Send() API
     else:
         topic = state["topic"]
+        configurable = configuration.Configuration.from_runnable_config(config)
+
+        # Launch the most expensive interviews first, so none of them starts last and stretches the run
+        analysts = list(state["analysts"])
+        mean_persona_length = sum(len(a.persona) for a in analysts) / max(len(analysts), 1)
+        max_num_turns = state.get("max_num_turns", 2)
+        costs = {a.persona: estimate_interview_cost(a, max_num_turns, mean_persona_length) for a in analysts}
+        fifo_positions = {a.persona: i for i, a in enumerate(analysts)}
+        order = analysts
+        if configurable.interview_schedule == "longest_first":
+            order = longest_first(analysts, lambda a: costs[a.persona])
+
         return [Send("conduct_interview", {"analyst": analyst,
-                                           "messages": [HumanMessage(
-                                               content=f"So you said you were writing an article on {topic}?"
-                                           )
-                                                       ]}) for analyst in state["analysts"]]
+                                           "doc_store_id": state.get("doc_store_id"),
+                                           "prefetch_id": state.get("prefetch_id"),
+                                           "max_num_turns": max_num_turns,
+                                           "estimated_cost": costs[analyst.persona],
+                                           "fifo_position": fifo_positions[analyst.persona],
+                                           "launch_position": position,
+                                           "messages": [first_message(topic)]}) for position, analyst in enumerate(order)]
 
 # Write a report based on the interviews
 report_writer_instructions = """You are a technical writer creating a report on this overall topic: 
@@ -501,32 +824,28 @@ def write_conclusion(state: ResearchGraphState):
     conclusion = llm.invoke([instructions]+[HumanMessage(content=f"Write the report conclusion")]) 
     return {"conclusion": conclusion.content}
 
-def finalize_report(state: ResearchGraphState):
+def finalize_report(state: ResearchGraphState, config: RunnableConfig):
 
     """ The is the "reduce" step where we gather all the sections, combine them, and reflect on them to write the intro/conclusion """
 
     # Save full final report
-    content = state["content"]
-    if content.startswith("## Insights"):
-        content = content.strip("## Insights")
-    if "## Sources" in content:
-        try:
-            content, sources = content.split("\n## Sources\n")
-        except:
-            sources = None
-    else:
-        sources = None
+    final_report = assemble_report(state["introduction"], state["content"], state["conclusion"])
+
+    # How the interview launch order did against FIFO
+    schedule = state.get("interview_schedule", [])
+    schedule_stats = makespan_report(schedule, config.get("max_concurrency") or max(len(schedule), 1))
 
-    final_report = state["introduction"] + "\n\n---\n\n" + content + "\n\n---\n\n" + state["conclusion"]
-    if sources is not None:
-        final_report += "\n\n## Sources\n" + sources
-    return {"final_report": final_report}
+    # The interviews are done, failed or not; free the run's documents, prefetched turns and interview results
+    pop_store(state.get("doc_store_id"))
+    cancel_prefetch(state.get("prefetch_id"))
+    branch_results.drop(state.get("doc_store_id"))
+    return {"final_report": final_report, "schedule_stats": schedule_stats}
 
 # Add nodes and edges 
 builder = StateGraph(ResearchGraphState)
 builder.add_node("create_analysts", create_analysts)
 builder.add_node("human_feedback", human_feedback)
-builder.add_node("conduct_interview", interview_builder.compile())
+builder.add_node("conduct_interview", interview_graph, retry=interview_retry_policy)
 builder.add_node("write_report",write_report)
 builder.add_node("write_introduction",write_introduction)
 builder.add_node("write_conclusion",write_conclusion)
@@ -543,4 +862,4 @@ builder.add_edge(["write_conclusion", "write_report", "write_introduction"], "fi
 builder.add_edge("finalize_report", END)
 
 # Compile
-graph = builder.compile(interrupt_before=['human_feedback'])
\ No newline at end of file
+graph = builder.compile(interrupt_before=['human_feedback']).with_config(max_concurrency=default_max_concurrency)
\ No newline at end of file
@@ -0,0 +1,115 @@
+import os
+from concurrent.futures import as_completed
+from typing import Any, Callable, Optional
+
+import wikipedia
+from langchain_community.document_loaders import WikipediaLoader
+from langchain_community.tools import TavilySearchResults
+from langchain_core.documents import Document
+from langchain_core.runnables.config import ContextThreadPoolExecutor
+
+from retrieval_cache import RetrievalCache
+
+# Shared on-disk cache for web and Wikipedia retrieval; repeated queries skip the network
+cache = RetrievalCache(os.environ.get(
+    "RETRIEVAL_CACHE_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), ".retrieval_cache.sqlite"),
+))
+
+def search_tavily(query: str, max_results: int = 3) -> list[dict]:
+    """ Web search results ({"url", "content"} dicts) for a query, through the retrieval cache """
+
+    def fetch():
+        results = TavilySearchResults(max_results=max_results).invoke(query)
+        # The tool reports failures as a string; raise so the error is not cached
+        if not isinstance(results, list):
+            raise RuntimeError(f"Tavily search failed: {results}")
+        return results
+
+    return cache.get_or_fetch("tavily", query, fetch, max_results=max_results)
+
+def load_wikipedia(query: str, load_max_docs: int = 2) -> list[Document]:
+    """ Wikipedia pages for a query, through the retrieval cache """
+
+    def fetch():
+        docs = WikipediaLoader(query=query, load_max_docs=load_max_docs).load()
+        return [{"page_content": doc.page_content, "metadata": doc.metadata} for doc in docs]
+
+    docs = cache.get_or_fetch("wikipedia", query, fetch, load_max_docs=load_max_docs)
+    return [Document(**doc) for doc in docs]
+
+def search_wikipedia_titles(query: str, max_results: int = 2) -> list[str]:
+    """ Titles of the Wikipedia pages matching a query, through the retrieval cache """
+
+    return cache.get_or_fetch(
+        "wikipedia_search", query, lambda: wikipedia.search(query[:300], results=max_results), max_results=max_results
+    )
+
+def load_wikipedia_page(title: str, max_chars: int = 4000) -> Optional[Document]:
+    """ One Wikipedia page by exact title, through the retrieval cache; None if there is no such page
+
+    Matches the documents WikipediaLoader returns for the same page.
+    """
+
+    def fetch():
+        try:
+            page = wikipedia.page(title=title, auto_suggest=False)
+        except (wikipedia.exceptions.PageError, wikipedia.exceptions.DisambiguationError):
+            return None
+        return {
+            "page_content": page.content[:max_chars],
+            "metadata": {"title": title, "summary": page.summary, "source": page.url},
+        }
+
+    doc = cache.get_or_fetch("wikipedia_page", title, fetch, max_chars=max_chars)
+    return None if doc is None else Document(**doc)
+
+def format_web_docs(search_docs: list[dict]) -> str:
+    return "\n\n---\n\n".join(
+        [
+            f'<Document href="{doc["url"]}"/>\n{doc["content"]}\n</Document>'
+            for doc in search_docs
+        ]
+    )
+
+def format_wikipedia_docs(search_docs: list[Document]) -> str:
+    return "\n\n---\n\n".join(
+        [
+            f'<Document source="{doc.metadata["source"]}" page="{doc.metadata.get("page", "")}"/>\n{doc.page_content}\n</Document>'
+            for doc in search_docs
+        ]
+    )
+
+def gather_first_k(sources: dict[str, Callable[[], Any]],
+                   k: int,
+                   deadline: float) -> tuple[dict[str, Any], list[dict]]:
+    """ Run retrieval sources in parallel and return once k of them have answered or the deadline passes
+
+    Returns the results by source name, and a record of every dropped source with the reason:
+    "deadline" (still running when time ran out), "not needed" (k sources had already answered)
+    or "error". Dropped sources are not waited for; a straggler that finishes later still
+    fills the retrieval cache for the next request.
+    """
+
+    executor = ContextThreadPoolExecutor(max_workers=len(sources))
+    futures = {executor.submit(fetch): name for name, fetch in sources.items()}
+    results, dropped = {}, []
+    try:
+        for future in as_completed(futures, timeout=deadline):
+            name = futures[future]
+            try:
+                results[name] = future.result()
+            except Exception as e:
+                dropped.append({"source": name, "reason": "error", "error": repr(e)})
+            if len(results) >= k:
+                break
+    except TimeoutError:
+        pass
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    finished = set(results) | {d["source"] for d in dropped}
+    for name in futures.values():
+        if name not in finished:
+            dropped.append({"source": name, "reason": "not needed" if len(results) >= k else "deadline"})
+    return results, dropped
@@ -0,0 +1,103 @@
+import hashlib
+import json
+import re
+import sqlite3
+import threading
+import time
+from typing import Any, Callable
+
+class RetrievalCache:
+    """SQLite-backed cache for retrieval results, keyed by source, normalized query and loader parameters.
+
+    Entries younger than ttl are returned as-is. Entries past ttl but within stale_ttl are still
+    returned immediately while a background fetch refreshes them (stale-while-revalidate).
+    Older entries are fetched again. Once the cache holds more than max_entries, the least recently
+    used entries are evicted. Values must be JSON-serializable.
+    """
+
+    def __init__(self,
+                 path: str,
+                 ttl: float = 24 * 3600,
+                 stale_ttl: float = 7 * 24 * 3600,
+                 max_entries: int = 10_000):
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._refreshing = set()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS retrieval_cache "
+                "(key TEXT PRIMARY KEY, value TEXT, fetched_at REAL, accessed_at REAL)"
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS retrieval_cache_accessed ON retrieval_cache (accessed_at)"
+            )
+
+    @staticmethod
+    def normalize(query: str) -> str:
+        """Lowercase, collapse whitespace and drop surrounding punctuation, so trivially different queries share an entry."""
+        return re.sub(r"\s+", " ", query.lower()).strip(" \t\n?!.,;:'\"")
+
+    def key(self, source: str, query: str, **params) -> str:
+        raw = json.dumps([source, self.normalize(query), params], sort_keys=True)
+        return hashlib.sha256(raw.encode()).hexdigest()
+
+    def get_or_fetch(self, source: str, query: str, fetch: Callable[[], Any], **params) -> Any:
+        """Return the cached value for this query, calling fetch() only on a miss or an expired entry."""
+        key = self.key(source, query, **params)
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, fetched_at FROM retrieval_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is not None:
+                with self._conn:
+                    self._conn.execute("UPDATE retrieval_cache SET accessed_at = ? WHERE key = ?", (now, key))
+
+        if row is not None:
+            value, fetched_at = json.loads(row[0]), row[1]
+            age = now - fetched_at
+            if age < self.ttl:
+                return value
+            if age < self.ttl + self.stale_ttl:
+                self._revalidate(key, fetch)
+                return value
+
+        value = fetch()
+        self._put(key, value)
+        return value
+
+    def _revalidate(self, key: str, fetch: Callable[[], Any]) -> None:
+        with self._lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+
+        def refresh():
+            try:
+                self._put(key, fetch())
+            except Exception:
+                # Keep serving the stale entry; the next read past its ttl tries again
+                pass
+            finally:
+                with self._lock:
+                    self._refreshing.discard(key)
+
+        threading.Thread(target=refresh, daemon=True).start()
+
+    def _put(self, key: str, value: Any) -> None:
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO retrieval_cache (key, value, fetched_at, accessed_at) VALUES (?, ?, ?, ?)",
+                (key, json.dumps(value), now, now),
+            )
+            (count,) = self._conn.execute("SELECT COUNT(*) FROM retrieval_cache").fetchone()
+            if count > self.max_entries:
+                self._conn.execute(
+                    "DELETE FROM retrieval_cache WHERE key IN "
+                    "(SELECT key FROM retrieval_cache ORDER BY accessed_at LIMIT ?)",
+                    (count - self.max_entries,),
+                )
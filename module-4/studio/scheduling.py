@@ -0,0 +1,76 @@
+import functools
+import heapq
+import threading
+import time
+from typing import Callable, Optional
+
+class NodeTimings:
+    """Running averages of how long each graph node takes, recorded as the nodes run.
+
+    Each node keeps an exponentially weighted moving average, so estimates follow recent runs.
+    Nodes that have not run yet fall back to the given default.
+    """
+
+    def __init__(self, alpha: float = 0.2):
+        self.alpha = alpha
+        self._means: dict[str, float] = {}
+        self._counts: dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def record(self, node: str, seconds: float) -> None:
+        with self._lock:
+            mean = self._means.get(node)
+            self._means[node] = seconds if mean is None else mean + self.alpha * (seconds - mean)
+            self._counts[node] = self._counts.get(node, 0) + 1
+
+    def mean(self, node: str, default: float) -> float:
+        with self._lock:
+            return self._means.get(node, default)
+
+    def count(self, node: str) -> int:
+        with self._lock:
+            return self._counts.get(node, 0)
+
+    def timed(self, node: str, func: Callable) -> Callable:
+        """Wrap a node function so every call is recorded under node; the signature is kept for LangGraph."""
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self.record(node, time.perf_counter() - start)
+
+        return wrapper
+
+# Shared by the graphs of this process
+node_timings = NodeTimings()
+
+def simulate_makespan(durations: list[float], max_concurrency: int) -> float:
+    """Makespan of running jobs in the given order on max_concurrency workers, each job taking the next free worker."""
+    workers = [0.0] * min(max_concurrency, len(durations))
+    for duration in durations:
+        heapq.heappush(workers, heapq.heappop(workers) + duration)
+    return max(workers, default=0.0)
+
+def longest_first(items: list, estimate: Callable[..., float]) -> list:
+    """Items ordered by estimated cost, most expensive first; equal estimates keep their order."""
+    return sorted(items, key=lambda item: -estimate(item))
+
+def makespan_report(jobs: list[dict], max_concurrency: int) -> Optional[dict]:
+    """Compare the launch order a fan-out used with FIFO, from the measured duration of each job.
+
+    jobs are {"fifo_position", "launch_position", "duration"} dicts. Both makespans are simulated
+    from the same measured durations, so the comparison does not depend on timing noise.
+    """
+    if not jobs:
+        return None
+    launched = [j["duration"] for j in sorted(jobs, key=lambda j: j["launch_position"])]
+    fifo = [j["duration"] for j in sorted(jobs, key=lambda j: j["fifo_position"])]
+    scheduled, baseline = simulate_makespan(launched, max_concurrency), simulate_makespan(fifo, max_concurrency)
+    return {
+        "makespan": scheduled,
+        "fifo_makespan": baseline,
+        "improvement": (baseline - scheduled) / baseline if baseline else 0.0,
+    }
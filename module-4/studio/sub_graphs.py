@@ -1,8 +1,18 @@
-from operator import add
+import os
+import tempfile
 from typing import List, Optional, Annotated
 from typing_extensions import TypedDict
+from langgraph.constants import Send
 from langgraph.graph import StateGraph, START, END
 
+from blob_store import BlobHandle, BlobStore
+from fa_shards import analyze_shard, shard_pool
+from log_batch import LogBatch
+from log_ingest import LogChunk, byte_ranges, chunk_file, read_chunk, spool
+from processed_logs import ProcessedLogs, merge_processed_logs
+from rate_limit import FanOutScheduler
+from reducers import extend_chunks
+
 # The structure of the logs
 class Log(TypedDict):
     id: str
@@ -13,29 +23,79 @@ class Log(TypedDict):
     grader: Optional[str]
     feedback: Optional[str]
 
+# Log batches are stored here once and passed to the subgraphs as a BlobHandle, so state and checkpoints
+# hold the handle instead of a copy of the logs per graph
+blobs = BlobStore(os.environ.get(
+    "BLOB_STORE_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), ".blobs"),
+))
+
+class LentLogs:
+    """Logs lent to subgraph runs through their state by a LogLender, instead of the logs themselves."""
+
+    __slots__ = ("logs", "lender")
+
+    def __init__(self, logs, lender: "LogLender"):
+        self.logs = logs
+        self.lender = lender
+
+class LogLender:
+    """Lends logs to subgraph runs and takes them back when closed.
+
+    LangGraph 0.2 leaves the channels of a finished run in a reference cycle, so a value in its state lives
+    until the garbage collector gets to the cycle. The runs get a LentLogs instead; logs derived from it
+    (see lend_like) are lent by the same lender, and closing it leaves only empty holders in the cycle.
+    """
+
+    def __init__(self):
+        self._lent: list[LentLogs] = []
+
+    def lend(self, logs) -> LentLogs:
+        lent = LentLogs(logs, self)
+        self._lent.append(lent)
+        return lent
+
+    def close(self) -> None:
+        for lent in self._lent:
+            lent.logs = None
+        self._lent.clear()
+
+def resolve_logs(value):
+    """ The logs value refers to: a BlobHandle, LentLogs, or the logs themselves """
+    return value.logs if isinstance(value, LentLogs) else blobs.resolve(value)
+
+def lend_like(source, logs):
+    """ logs, lent by source's lender if source is lent """
+    return source.lender.lend(logs) if isinstance(source, LentLogs) else logs
+
 # Failure Analysis Sub-graph
+# cleaned_logs and failures can also be a columnar LogBatch (see log_batch.py), filtered with array operations
 class FailureAnalysisState(TypedDict):
-    cleaned_logs: List[Log]
-    failures: List[Log]
+    cleaned_logs: BlobHandle # Or LentLogs, or the logs themselves (a list or a LogBatch)
+    failures: List[Log] # Or LentLogs, if cleaned_logs is
     fa_summary: str
-    processed_logs: List[str]
+    processed_logs: ProcessedLogs
 
 class FailureAnalysisOutputState(TypedDict):
     fa_summary: str
-    processed_logs: List[str]
+    processed_logs: ProcessedLogs
 
 def get_failures(state):
     """ Get logs that contain a failure """
-    cleaned_logs = state["cleaned_logs"]
-    failures = [log for log in cleaned_logs if "grade" in log]
-    return {"failures": failures}
+    cleaned_logs = resolve_logs(state["cleaned_logs"])
+    if isinstance(cleaned_logs, LogBatch):
+        failures = cleaned_logs.failures()
+    else:
+        failures = [log for log in cleaned_logs if "grade" in log]
+    return {"failures": lend_like(state["cleaned_logs"], failures)}
 
 def generate_summary(state):
     """ Generate summary of failures """
-    failures = state["failures"]
+    failures = resolve_logs(state["failures"])
     # Add fxn: fa_summary = summarize(failures)
     fa_summary = "Poor quality retrieval of Chroma documentation."
-    return {"fa_summary": fa_summary, "processed_logs": [f"failure-analysis-on-log-{failure['id']}" for failure in failures]}
+    ids = failures.ids if isinstance(failures, LogBatch) else [failure["id"] for failure in failures]
+    return {"fa_summary": fa_summary, "processed_logs": ProcessedLogs.of("failure-analysis", ids)}
 
 fa_builder = StateGraph(input=FailureAnalysisState,output=FailureAnalysisOutputState)
 fa_builder.add_node("get_failures", get_failures)
@@ -46,20 +106,21 @@ fa_builder.add_edge("generate_summary", END)
 
 # Summarization subgraph
 class QuestionSummarizationState(TypedDict):
-    cleaned_logs: List[Log]
+    cleaned_logs: BlobHandle # Or LentLogs, or the logs themselves (a list or a LogBatch)
     qs_summary: str
     report: str
-    processed_logs: List[str]
+    processed_logs: ProcessedLogs
 
 class QuestionSummarizationOutputState(TypedDict):
     report: str
-    processed_logs: List[str]
+    processed_logs: ProcessedLogs
 
 def generate_summary(state):
-    cleaned_logs = state["cleaned_logs"]
+    cleaned_logs = resolve_logs(state["cleaned_logs"])
     # Add fxn: summary = summarize(generate_summary)
     summary = "Questions focused on usage of ChatOllama and Chroma vector store."
-    return {"qs_summary": summary, "processed_logs": [f"summary-on-log-{log['id']}" for log in cleaned_logs]}
+    ids = cleaned_logs.ids if isinstance(cleaned_logs, LogBatch) else [log["id"] for log in cleaned_logs]
+    return {"qs_summary": summary, "processed_logs": ProcessedLogs.of("summary", ids)}
 
 def send_to_slack(state):
     qs_summary = state["qs_summary"]
@@ -76,28 +137,191 @@ qs_builder.add_edge("send_to_slack", END)
 
 # Entry Graph
 class EntryGraphState(TypedDict):
-    raw_logs: List[Log]
-    cleaned_logs: List[Log]
+    raw_logs: List[Log] # Or a handle from blobs.put(logs), to keep the logs out of the checkpoints too
+    cleaned_logs: BlobHandle # Handle to the cleaned logs in blobs, shared by both sub-graphs; released when they finish
     fa_summary: str # This will only be generated in the FA sub-graph
     report: str # This will only be generated in the QS sub-graph
-    processed_logs:  Annotated[List[int], add] # This will be generated in BOTH sub-graphs
+    processed_logs: Annotated[ProcessedLogs, merge_processed_logs] # This will be generated in BOTH sub-graphs
 
-def clean_logs(state):
-    # Get logs
-    raw_logs = state["raw_logs"]
+def clean(raw_logs: List[Log]) -> List[Log]:
     # Data cleaning raw_logs -> docs 
     cleaned_logs = raw_logs
-    return {"cleaned_logs": cleaned_logs}
+    return cleaned_logs
+
+def clean_logs(state):
+    # Get logs
+    raw_logs = blobs.resolve(state["raw_logs"])
+    cleaned_logs = clean(raw_logs)
+    # Stored once; both sub-graphs receive the handle
+    return {"cleaned_logs": blobs.put(cleaned_logs)}
+
+def release_logs(state):
+    # Both sub-graphs are done with the cleaned logs: drop them from blobs (disk and memory)
+    blobs.release(state["cleaned_logs"])
+    return {}
 
 entry_builder = StateGraph(EntryGraphState)
 entry_builder.add_node("clean_logs", clean_logs)
 entry_builder.add_node("question_summarization", qs_builder.compile())
 entry_builder.add_node("failure_analysis", fa_builder.compile())
+entry_builder.add_node("release_logs", release_logs)
 
 entry_builder.add_edge(START, "clean_logs")
 entry_builder.add_edge("clean_logs", "failure_analysis")
 entry_builder.add_edge("clean_logs", "question_summarization")
-entry_builder.add_edge("failure_analysis", END)
-entry_builder.add_edge("question_summarization", END)
+entry_builder.add_edge(["failure_analysis", "question_summarization"], "release_logs")
+entry_builder.add_edge("release_logs", END)
+
+graph = entry_builder.compile()
+
+# Streaming entry graph: logs are read from a JSONL file in chunks (use log_ingest.spool to write
+# an iterator of logs to one), and each chunk is cleaned and analyzed on its own, so only the chunks
+# being analyzed are in memory at once
+
+# Logs per chunk, unless the input sets chunk_size
+log_chunk_size = 10_000
+
+# Analyze each chunk as a columnar LogBatch when NumPy is installed; chunks never reach a checkpoint,
+# so the arrays do not need to be serializable
+columnar_logs = LogBatch.available
+
+# Max number of chunks being analyzed at once
+chunk_fan_out = FanOutScheduler(max_concurrency=4)
+
+# The subgraphs run once per chunk inside analyze_chunk, without checkpoints of their own
+fa_graph = fa_builder.compile(checkpointer=False)
+qs_graph = qs_builder.compile(checkpointer=False)
+
+class StreamingEntryGraphState(TypedDict):
+    log_path: str # JSONL file of logs
+    chunk_size: int # Logs per chunk
+    chunks: List[LogChunk] # Chunk descriptors (file offsets), not the logs themselves
+    fa_summaries: Annotated[List[str], extend_chunks] # Failure analysis summary of each chunk
+    reports: Annotated[List[str], extend_chunks] # Question summarization report of each chunk
+    fa_summary: str
+    report: str
+    processed_logs: Annotated[ProcessedLogs, merge_processed_logs]
+
+class ChunkState(TypedDict):
+    chunk: LogChunk
+
+def ingest_logs(state):
+    # Index the file into chunks; the logs are read later, one chunk at a time
+    chunks = chunk_file(state["log_path"], state.get("chunk_size") or log_chunk_size)
+    return {"chunks": chunks}
+
+def send_chunks(state):
+    if not state["chunks"]:
+        return "merge_summaries"
+    return [Send("analyze_chunk", {"chunk": chunk}) for chunk in state["chunks"]]
+
+def analyze_chunk(state: ChunkState):
+    with chunk_fan_out.slot():
+        cleaned_logs = clean(read_chunk(state["chunk"]))
+        if columnar_logs:
+            cleaned_logs = LogBatch.from_logs(cleaned_logs)
+        # Lent rather than passed, so the chunk is freed as soon as the subgraphs are done with it
+        lender = LogLender()
+        try:
+            lent = lender.lend(cleaned_logs)
+            failure_analysis = fa_graph.invoke({"cleaned_logs": lent})
+            question_summarization = qs_graph.invoke({"cleaned_logs": lent})
+        finally:
+            lender.close()
+    return {"fa_summaries": [failure_analysis["fa_summary"]],
+            "reports": [question_summarization["report"]],
+            "processed_logs": failure_analysis["processed_logs"].merge(question_summarization["processed_logs"])}
+
+def merge_summaries(state):
+    # Add fxn: fa_summary = summarize(fa_summaries), report = report_generation(reports)
+    fa_summary = "\n".join(dict.fromkeys(state.get("fa_summaries", [])))
+    report = "\n".join(dict.fromkeys(state.get("reports", [])))
+    return {"fa_summary": fa_summary, "report": report}
+
+streaming_builder = StateGraph(StreamingEntryGraphState)
+streaming_builder.add_node("ingest_logs", ingest_logs)
+streaming_builder.add_node("analyze_chunk", analyze_chunk)
+streaming_builder.add_node("merge_summaries", merge_summaries)
+
+streaming_builder.add_edge(START, "ingest_logs")
+streaming_builder.add_conditional_edges("ingest_logs", send_chunks, ["analyze_chunk", "merge_summaries"])
+streaming_builder.add_edge("analyze_chunk", "merge_summaries")
+streaming_builder.add_edge("merge_summaries", END)
+
+streaming_graph = streaming_builder.compile()
+
+# Sharded failure analysis: a JSONL file of logs is split into byte ranges by its size alone, and each range
+# is analyzed with fa_graph in a worker process (see fa_shards.py), which reads the lines that start in it;
+# merge_failure_analysis combines the partial results. Logs already in a file (log_path) are read from it
+# as they are; logs in memory (cleaned_logs) are spooled to a temporary file first
+
+# Bytes of the log file per partition
+fa_partition_bytes = 16 * 2**20
+
+class ShardedFailureAnalysisInputState(TypedDict):
+    cleaned_logs: BlobHandle # Or the logs themselves (a list or a LogBatch)
+    log_path: str # Or a JSONL file of the logs, used in place of cleaned_logs
+
+class ShardedFailureAnalysisState(TypedDict):
+    cleaned_logs: BlobHandle
+    log_path: str
+    fa_summaries: Annotated[List[str], extend_chunks] # Failure analysis summary of each partition
+    fa_summary: str
+    processed_logs: Annotated[ProcessedLogs, merge_processed_logs]
+
+def analyze_log_file(log_path: str) -> list[dict]:
+    """ Failure analysis of each byte range of a JSONL file of logs, in the worker processes """
+    futures = [shard_pool().submit(analyze_shard, partition) for partition in byte_ranges(log_path, fa_partition_bytes)]
+    try:
+        return [future.result() for future in futures]
+    finally:
+        # After a failure, the partitions not started yet are not run
+        for future in futures:
+            future.cancel()
+
+def analyze_partitions(state):
+    if state.get("log_path"):
+        results = analyze_log_file(state["log_path"])
+    else:
+        cleaned_logs = blobs.resolve(state["cleaned_logs"])
+        if isinstance(cleaned_logs, LogBatch):
+            cleaned_logs = cleaned_logs.to_logs()
+        # The spooled file lives only as long as this node, whether the partitions succeed or not
+        with tempfile.TemporaryDirectory(prefix="fa-shards-") as spool_dir:
+            results = analyze_log_file(spool(cleaned_logs, os.path.join(spool_dir, "logs.jsonl")))
+    if not results:
+        return {}
+    processed_logs = results[0]["processed_logs"]
+    for result in results[1:]:
+        processed_logs = processed_logs.merge(result["processed_logs"])
+    return {"fa_summaries": [result["fa_summary"] for result in results], "processed_logs": processed_logs}
+
+def merge_failure_analysis(state):
+    # Add fxn: fa_summary = summarize(fa_summaries)
+    fa_summary = "\n".join(dict.fromkeys(state.get("fa_summaries", [])))
+    return {"fa_summary": fa_summary}
+
+sharded_fa_builder = StateGraph(ShardedFailureAnalysisState, input=ShardedFailureAnalysisInputState, output=FailureAnalysisOutputState)
+sharded_fa_builder.add_node("analyze_partitions", analyze_partitions)
+sharded_fa_builder.add_node("merge_failure_analysis", merge_failure_analysis)
+sharded_fa_builder.add_edge(START, "analyze_partitions")
+sharded_fa_builder.add_edge("analyze_partitions", "merge_failure_analysis")
+sharded_fa_builder.add_edge("merge_failure_analysis", END)
+
+# Failure analysis on its own, for example of a log file: sharded_fa_graph.invoke({"log_path": path})
+sharded_fa_graph = sharded_fa_builder.compile()
+
+# The entry graph, with failure analysis sharded across processes
+sharded_builder = StateGraph(EntryGraphState)
+sharded_builder.add_node("clean_logs", clean_logs)
+sharded_builder.add_node("question_summarization", qs_builder.compile())
+sharded_builder.add_node("failure_analysis", sharded_fa_graph)
+sharded_builder.add_node("release_logs", release_logs)
+
+sharded_builder.add_edge(START, "clean_logs")
+sharded_builder.add_edge("clean_logs", "failure_analysis")
+sharded_builder.add_edge("clean_logs", "question_summarization")
+sharded_builder.add_edge(["failure_analysis", "question_summarization"], "release_logs")
+sharded_builder.add_edge("release_logs", END)
 
-graph = entry_builder.compile()
\ No newline at end of file
+sharded_graph = sharded_builder.compile()
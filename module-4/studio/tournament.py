@@ -0,0 +1,100 @@
+import threading
+from collections import OrderedDict
+from typing import Callable, Optional
+
+from langchain_core.runnables.config import ContextThreadPoolExecutor
+
+# Max number of batches judged at once, across every tournament of the process
+judge_workers = 4
+
+# Shared by all tournaments, so a tournament abandoned by a failed run leaves no threads behind
+_executor = ContextThreadPoolExecutor(max_workers=judge_workers)
+
+class Tournament:
+    """Hierarchical reduce that picks one winner from any number of items.
+
+    Items are judged in fixed-size batches and each batch winner advances to the next round.
+    A batch is judged in the background (on the executor shared by all tournaments) as soon as it fills up, so while a fan-out is still
+    producing items the early rounds are already being played. winner() waits for the batches
+    in flight and plays the partial batches left over in each round.
+    """
+
+    def __init__(self,
+                 judge: Callable[[list], int],
+                 batch_size: int = 8):
+        self.judge = judge
+        self.batch_size = batch_size
+        self.submitted = 0
+        self._pending: dict[int, list] = {}
+        self._in_flight = []
+        self._lock = threading.Lock()
+
+    def submit(self, item) -> None:
+        """Enter an item in the first round."""
+        with self._lock:
+            self.submitted += 1
+        self._advance(item, 0)
+
+    def _advance(self, item, round_: int) -> None:
+        with self._lock:
+            pending = self._pending.setdefault(round_, [])
+            pending.append(item)
+            if len(pending) < self.batch_size:
+                return
+            batch = pending[:]
+            pending.clear()
+            self._in_flight.append(_executor.submit(self._play, batch, round_))
+
+    def _play(self, batch: list, round_: int) -> None:
+        self._advance(self._pick(batch), round_ + 1)
+
+    def _pick(self, batch: list):
+        if len(batch) == 1:
+            return batch[0]
+        index = self.judge(batch)
+        return batch[min(max(index, 0), len(batch) - 1)]
+
+    def winner(self):
+        """Return the overall winner, or None if nothing was submitted."""
+        # Wait for the batches being judged; each one may fill and start a batch in the next round
+        while True:
+            with self._lock:
+                in_flight, self._in_flight = self._in_flight, []
+            if not in_flight:
+                break
+            for future in in_flight:
+                future.result()
+
+        # Play the partial batch left in each round, lowest round first
+        round_ = 0
+        while True:
+            items = self._pending.pop(round_, [])
+            if not self._pending and len(items) <= 1:
+                return items[0] if items else None
+            if items:
+                self._pending.setdefault(round_ + 1, []).append(self._pick(items))
+            round_ += 1
+
+# Max number of tournaments kept in memory. A run that fails before picking its winner never pops its
+# tournament; the least recently started ones are dropped beyond this (a run that resumes after that
+# replays its tournament from state)
+max_tournaments = 64
+
+# Tournaments of in-progress runs, keyed by an id carried in graph state
+_tournaments: OrderedDict[str, Tournament] = OrderedDict()
+_tournaments_lock = threading.Lock()
+
+def start_tournament(tournament_id: str, judge: Callable[[list], int], **kwargs) -> Tournament:
+    with _tournaments_lock:
+        tournament = _tournaments[tournament_id] = Tournament(judge, **kwargs)
+        while len(_tournaments) > max_tournaments:
+            _tournaments.popitem(last=False)
+    return tournament
+
+def get_tournament(tournament_id: Optional[str]) -> Optional[Tournament]:
+    with _tournaments_lock:
+        return _tournaments.get(tournament_id)
+
+def pop_tournament(tournament_id: Optional[str]) -> Optional[Tournament]:
+    with _tournaments_lock:
+        return _tournaments.pop(tournament_id, None)
@@ -0,0 +1,102 @@
+"""Trimming of a thread's messages to a token budget, shared by the agents of module-1 and module-3.
+
+The studios list this directory as a local dependency in their langgraph.json.
+"""
+import json
+import weakref
+
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, ToolMessage
+
+# Rough characters-per-token ratio used to estimate prompt size without a tokenizer
+chars_per_token = 4
+
+# Fixed overhead per message for role / formatting tokens
+message_overhead_tokens = 4
+
+# Token counts keyed by message object, so each message is only measured once while it is in memory.
+# The key covers everything the count depends on (content and tool calls), since state updates replace
+# messages rather than change them in place; each entry goes away with its message.
+# Single dict operations are atomic, so there is no lock (which the weakref callback could deadlock on)
+_token_cache: dict[int, tuple[weakref.ref, int]] = {}
+
+def _evict(key: int, ref: weakref.ref) -> None:
+    if _token_cache.get(key, (None,))[0] is ref:
+        _token_cache.pop(key, None)
+
+def count_tokens(message: BaseMessage) -> int:
+    """Estimate the number of prompt tokens a message costs, cached per message object."""
+    cached = _token_cache.get(id(message))
+    if cached is not None and cached[0]() is message:
+        return cached[1]
+
+    content = message.content if isinstance(message.content, str) else json.dumps(message.content)
+    chars = len(content)
+    if isinstance(message, AIMessage):
+        chars += sum(len(call["name"]) + len(json.dumps(call["args"])) for call in message.tool_calls)
+    tokens = chars // chars_per_token + message_overhead_tokens
+
+    key = id(message)
+    _token_cache[key] = (weakref.ref(message, lambda ref: _evict(key, ref)), tokens)
+    return tokens
+
+def iter_groups_newest_first(messages: list[BaseMessage], start: int, stop: int):
+    """Yield the messages in messages[start:stop] as groups, newest group first.
+
+    An AI message that makes tool calls forms one group with the tool results that follow it;
+    every other message is a group of its own. Tool results whose tool call falls outside
+    the range are skipped, since a provider rejects a tool result without its call.
+    """
+    i = stop
+    while i > start:
+        i -= 1
+        if not isinstance(messages[i], ToolMessage):
+            yield [messages[i]]
+            continue
+        end = i + 1
+        while i > start and isinstance(messages[i - 1], ToolMessage):
+            i -= 1
+        if i > start and isinstance(messages[i - 1], AIMessage) and messages[i - 1].tool_calls:
+            i -= 1
+            yield messages[i:end]
+
+def trim_messages_to_budget(system_message: BaseMessage,
+                            messages: list[BaseMessage],
+                            max_tokens: int) -> list[BaseMessage]:
+    """Return the system message plus the most recent complete message groups that fit in max_tokens.
+
+    The latest human message is always kept so the model still sees the request it is working on,
+    as is the most recent group, even if together they exceed the budget.
+    Groups are walked newest first and the walk stops at the first group that does not fit,
+    so the cost of trimming depends on the size of the kept window, not on the length of the thread.
+    """
+    budget = max_tokens - count_tokens(system_message)
+
+    # Find the latest human message; everything after it belongs to the current request
+    latest_human = len(messages) - 1
+    while latest_human >= 0 and not isinstance(messages[latest_human], HumanMessage):
+        latest_human -= 1
+
+    pinned = []
+    if latest_human >= 0:
+        pinned = [messages[latest_human]]
+        budget -= count_tokens(messages[latest_human])
+
+    # Keep the newest tool-call / tool-result groups of the current request
+    kept = []
+    for group in iter_groups_newest_first(messages, latest_human + 1, len(messages)):
+        cost = sum(count_tokens(m) for m in group)
+        if kept and cost > budget:
+            return [system_message] + pinned + kept
+        budget -= cost
+        kept = group + kept
+
+    # The whole current request fits, so fill what is left with earlier turns
+    history = []
+    for group in iter_groups_newest_first(messages, 0, max(latest_human, 0)):
+        cost = sum(count_tokens(m) for m in group)
+        if cost > budget:
+            break
+        budget -= cost
+        history = group + history
+
+    return [system_message] + history + pinned + kept